@@ -0,0 +1,53 @@
+'''
+Measures time for selecting configurations from many weighted hints.
+'''
+import argparse
+import random
+import time
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--nr_values', type=int, default=1000,
+        help='Number of suggested values per parameter')
+    parser.add_argument(
+        '--nr_configs', type=int, default=50,
+        help='Number of configurations to select')
+    parser.add_argument(
+        '--nr_params', type=int, default=1, help='Number of parameters')
+    parser.add_argument(
+        '--reference_configs', type=int, default=1,
+        help='Number of configurations selected by scalar implementation')
+    args = parser.parse_args()
+    print(f'Input arguments: {args}')
+    from search.search_with_hints import ParameterExplorer
+    from search.test_search_with_hints import reference_config
+
+    random.seed(0)
+    units = ['', 'kB', 'MB', 'GB']
+    hint_to_weight = {}
+    for p in range(args.nr_params):
+        for v in range(args.nr_values):
+            value = str(v + 1) + random.choice(units)
+            hint_to_weight[(f'param_{p}', value)] = random.choice([1, 2, 4, 8])
+    explorer = ParameterExplorer(None, None, None)
+    param_to_w_vals = explorer._gather_values(hint_to_weight)
+
+    start_s = time.time()
+    configs = []
+    for _ in range(args.nr_configs):
+        configs.append(explorer._next_config(configs, param_to_w_vals))
+    vector_s = time.time() - start_s
+    print(f'Vectorized: {vector_s:.3f} s for {args.nr_configs} configurations')
+
+    start_s = time.time()
+    ref_configs = []
+    for _ in range(args.reference_configs):
+        ref_configs.append(reference_config(
+            explorer, ref_configs, param_to_w_vals))
+    ref_s = time.time() - start_s
+    print(f'Scalar: {ref_s:.3f} s for {args.reference_configs} configurations')
+    assert ref_configs == configs[:args.reference_configs]
+    print('Selected configurations are identical')
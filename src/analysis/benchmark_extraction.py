@@ -0,0 +1,91 @@
+'''
+Measures hint extraction throughput for different batch sizes.
+'''
+import argparse
+import re
+import time
+
+
+def baseline_hints(docs, doc_ids):
+    """ Extracts hints like the original, unbatched implementation.
+
+    Runs the question answering pipeline once per (parameter, passage)
+    pair and the zero-shot classification pipeline once per percentage.
+
+    Args:
+        docs: document collection to extract hints from
+        doc_ids: extract hints from documents with those IDs
+
+    Returns:
+        list of (document, parameter, value, recommendation) tuples
+    """
+    import parameters.util
+    hints = []
+    for doc_id in doc_ids:
+        for passage in docs.passages_by_doc[doc_id]:
+            exp_passage = docs._preprocess_passage(passage)
+            params = re.finditer(parameters.util.param_reg, exp_passage)
+            for p_name in set([p.group() for p in params]):
+                question = f'Which values are recommended for {p_name}?'
+                qa_result = docs.qa_pipeline(
+                    {'question': question, 'context': exp_passage})
+                answer = qa_result['answer']
+                if qa_result['score'] > 0.05:
+                    for value in re.finditer(parameters.util.value_reg, answer):
+                        value_str = value.group()
+                        if '%' in value_str:
+                            labels = [f'{p_name}: {value_str} ({r})'
+                                      for r in docs.zsc_resources]
+                            docs.zsc_pipeline(passage, labels)
+                        hints.append((doc_id, p_name, value_str, answer))
+    return hints
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'text_source_path', type=str, help='Path to input text')
+    parser.add_argument(
+        '--max_length', type=int, default=128,
+        help='Maximal length of text chunk in tokens')
+    parser.add_argument(
+        '--batch_sizes', type=str, default='1,8,32',
+        help='Comma-separated batch sizes to compare with the baseline')
+    args = parser.parse_args()
+    print(f'Input arguments: {args}')
+    # Expensive import statements after parsing arguments
+    from doc.collection import DocCollection
+    from doc.hint_table import HintTable
+
+    # Parameter filtering and implicit references require a DBMS
+    docs = DocCollection(
+        docs_path=args.text_source_path, dbms=None,
+        size_threshold=args.max_length, filter_params=0,
+        use_implicit=0, lazy=True)
+    nr_passages = sum(docs.nr_passages)
+    doc_ids = list(range(docs.nr_docs))
+    # Load models before measuring time
+    docs.qa_pipeline
+    docs.zsc_pipeline
+
+    start_s = time.time()
+    base_hints = baseline_hints(docs, doc_ids)
+    elapsed_s = time.time() - start_s
+    print(f'Baseline: {nr_passages} passages in {elapsed_s:.2f} s ' \
+          f'({nr_passages/elapsed_s:.2f} passages/s)')
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        docs.batch_size = batch_size
+        docs.doc_to_hints = {}
+        docs.hints = HintTable()
+        docs.zsc_memo = {}
+        start_s = time.time()
+        docs._extract_hints(doc_ids)
+        elapsed_s = time.time() - start_s
+        hints = [(d, h.param.group(), h.value.group(), h.recommendation)
+                 for d in doc_ids for h in docs.doc_to_hints[d]]
+        same_hints = sorted(hints) == sorted(base_hints)
+        print(f'Batch size {batch_size}: {nr_passages} passages in ' \
+              f'{elapsed_s:.2f} s ({nr_passages/elapsed_s:.2f} passages/s), ' \
+              f'same hints as baseline: {same_hints}')
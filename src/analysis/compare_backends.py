@@ -0,0 +1,136 @@
+'''
+Compares accuracy and throughput of inference backends to the fp32 baseline.
+'''
+import argparse
+import re
+import time
+
+
+def sample_inputs(docs_paths, nr_passages, max_length):
+    """ Samples passages with parameters and values from documents.
+
+    Args:
+        docs_paths: paths to document files
+        nr_passages: number of passages to sample per document file
+        max_length: approximate passage length in words
+
+    Returns:
+        list of (passage, parameter) pairs
+    """
+    inputs = []
+    for docs_path in docs_paths:
+        file_inputs = []
+        for _, sentences in read_documents(docs_path):
+            lengths = [len(s.split()) for s in sentences]
+            for passage in split_passages(sentences, lengths, max_length):
+                params = re.findall(parameters.util.param_reg, passage)
+                if params and get_values(passage):
+                    file_inputs.append((passage, params[0]))
+        inputs += file_inputs[:nr_passages]
+    return inputs
+
+def run_backend(backend, inputs, batch_size):
+    """ Runs all models on inputs using given backend.
+
+    Models are invoked on padded batches as during hint extraction.
+
+    Args:
+        backend: name of inference backend
+        inputs: list of (passage, parameter) pairs
+        batch_size: number of inputs per model invocation
+
+    Returns:
+        dictionary mapping model names to outputs and run times
+    """
+    results = {}
+    qa = models.backend.load_pipeline(
+        'question-answering', DocCollection.qa_model, backend)
+    start_s = time.time()
+    answers = nlp.qa.answer(
+        qa, [f'Which values are recommended for {p}?' for _, p in inputs],
+        [passage for passage, _ in inputs], batch_size)
+    results['QA'] = ([a for a, _ in answers], time.time() - start_s)
+    del qa
+
+    zsc = models.backend.load_pipeline(
+        'zero-shot-classification', DocCollection.zsc_model, backend)
+    labels = DocCollection.zsc_resources
+    start_s = time.time()
+    probs = nlp.zero_shot.classify(
+        zsc, [passage for passage, _ in inputs], labels,
+        batch_size * len(labels), DocCollection.zsc_template)
+    winners = [labels[i] for i in probs.argmax(dim=1).tolist()]
+    results['ZSC'] = (winners, time.time() - start_s)
+    del zsc
+
+    encoder = models.backend.load_model(nlp.nlp_util.model_name, backend=backend)
+    tokenizer = nlp.nlp_util.tokenizer
+    encodings = []
+    start_s = time.time()
+    with torch.no_grad():
+        for batch_start in range(0, len(inputs), batch_size):
+            batch = [p for p, _ in inputs[batch_start:batch_start+batch_size]]
+            tokens = tokenizer(
+                batch, padding=True, truncation=True, return_tensors='pt')
+            states = encoder(**tokens).last_hidden_state
+            mask = tokens['attention_mask'].unsqueeze(-1)
+            encodings.append((states * mask).sum(1) / mask.sum(1))
+    results['BERT'] = (torch.cat(encodings), time.time() - start_s)
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--docs_paths', type=str, nargs='+',
+        default=['../demo_docs/postgres100', '../demo_docs/mysql100'],
+        help='Paths to document files')
+    parser.add_argument(
+        '--backends', type=str, default='fp32,int8',
+        help='Comma-separated backends to compare with fp32')
+    parser.add_argument(
+        '--nr_passages', type=int, default=100,
+        help='Number of passages per document file')
+    parser.add_argument(
+        '--max_length', type=int, default=64,
+        help='Approximate length of passages in words')
+    parser.add_argument(
+        '--batch_size', type=int, default=8,
+        help='Number of inputs per model invocation')
+    args = parser.parse_args()
+    print(f'Input arguments: {args}')
+    # Expensive import statements after parsing arguments
+    from doc.collection import DocCollection
+    from doc.util import get_values, read_documents, split_passages
+    import models.backend
+    import nlp.nlp_util
+    import nlp.qa
+    import nlp.zero_shot
+    import parameters.util
+    import torch
+
+    inputs = sample_inputs(args.docs_paths, args.nr_passages, args.max_length)
+    print(f'Nr. of sampled passages: {len(inputs)}')
+
+    baseline = run_backend('fp32', inputs, args.batch_size)
+    for backend in args.backends.split(','):
+        try:
+            results = baseline if backend == 'fp32' else run_backend(
+                backend, inputs, args.batch_size)
+        except ValueError as e:
+            print(f'Skipping backend {backend}: {e}')
+            continue
+        for model, (outputs, elapsed_s) in results.items():
+            base_outputs, base_s = baseline[model]
+            if model == 'BERT':
+                agreement = torch.nn.functional.cosine_similarity(
+                    outputs, base_outputs).mean().item()
+                metric = 'mean cosine similarity'
+            else:
+                agreement = sum(o == b for o, b in zip(
+                    outputs, base_outputs)) / len(outputs)
+                metric = 'agreement'
+            print(f'{backend} - {model}: {len(inputs)/elapsed_s:.2f} ' \
+                  f'inputs/s (speedup {base_s/elapsed_s:.2f}), ' \
+                  f'{metric} with fp32: {agreement:.3f}')
@@ -30,8 +30,12 @@ def from_args(args, dbms):
         else:
             objective = search.objectives.Objective.TIME
         benchbase_home = args.benchbase_home
+        # Replicas may use separate configuration files
+        port = str(dbms.port)
         benchbase_config = args.benchbase_config
-        benchbase_result = args.benchbase_result
+        if benchbase_config:
+            benchbase_config = benchbase_config.replace('{port}', port)
+        benchbase_result = args.benchbase_result.replace('{port}', port)
         benchmark_name = args.benchmark
         timeout = args.benchbase_timeout
         
@@ -4,6 +4,7 @@ Created on Apr 2, 2021
 @author: immanueltrummer
 '''
 from dbms.generic_dbms import ConfigurableDBMS
+from parameters.catalog import ParameterCatalog
 import os
 import psycopg2
 import time
@@ -12,7 +13,7 @@ class CockroachConfig(ConfigurableDBMS):
     """ Reconfigurable Postgres DBMS instance. """
     
     def __init__(self, db, user, password, restart_cmd, 
-                 recovery_cmd, timeout_s = 300):
+                 recovery_cmd, timeout_s = 300, port = 26257):
         """ Initialize DB connection with given credentials. 
         
         Args:
@@ -22,11 +23,13 @@ class CockroachConfig(ConfigurableDBMS):
             restart_cmd: command for restarting server
             recovery_cmd: command for recovering DB
             timeout_s: per-query timeout in seconds
+            port: port of database server
         """
         unit_to_size={}
         super().__init__(db, user, password, unit_to_size, 
-                         restart_cmd, recovery_cmd, timeout_s)
+                         restart_cmd, recovery_cmd, timeout_s, port)
         self.all_variables = self._query_params()
+        self.param_catalog = ParameterCatalog(self.all_variables)
         
     @classmethod
     def from_file(cls, config):
@@ -68,7 +71,7 @@ class CockroachConfig(ConfigurableDBMS):
         try:            
             self.connection = psycopg2.connect(
                 database = self.db, user = self.user, 
-                password = self.password, host = "localhost", port = 26257)
+                password = self.password, host = "localhost", port = self.port)
             self.set_timeout(self.timeout_s)
             self.failed_connections = 0
             return True
@@ -140,7 +143,7 @@ class CockroachConfig(ConfigurableDBMS):
     
     def is_param(self, param):
         """ Returns True iff given parameter exists. """
-        return param in self.all_variables
+        return param in self.param_catalog
         
     def get_value(self, param):
         """ Get current value of given parameter. """
@@ -7,6 +7,7 @@ from dbms.postgres import PgConfig
 from dbms.mysql import MySQLconfig
 from dbms.mariadb import MariaDBconfig
 from dbms.cockroach import CockroachConfig
+import argparse
 
 
 def from_file(config):
@@ -31,30 +32,63 @@ def from_file(config):
         raise ValueError(f'DBMS {dbms_name} is not supported!')
 
 
-def from_args(args):
+def from_args(args, port=None):
     """ Initialize DBMS object from command line arguments.
     
     Args:
         args: dictionary containing command line arguments.
+        port: connect to server on this port (default port if None).
     
     Returns:
         DBMS object.
     """
+    port_arg = {} if port is None else {'port':port}
     if args.dbms == 'pg':
         return PgConfig(
             args.db_name, args.db_user, args.db_pwd, args.restart_cmd, 
-            args.recover_cmd)
+            args.recover_cmd, **port_arg)
     elif args.dbms == 'ms':
         return MySQLconfig(
             args.db_name, args.db_user, args.db_pwd, args.restart_cmd, 
-            args.recover_cmd)
+            args.recover_cmd, **port_arg)
     elif args.dbms == 'md':
         return MariaDBconfig(
             args.db_name, args.db_user, args.db_pwd, args.restart_cmd, 
-            args.recover_cmd)
+            args.recover_cmd, **port_arg)
     elif args.dbms == 'cr':
         return CockroachConfig(
             args.db_name, args.db_user, args.db_pwd, args.restart_cmd, 
-            args.recover_cmd)
+            args.recover_cmd, **port_arg)
     else:
-        raise ValueError(f'DBMS {args.dbms} is not supported!')
\ No newline at end of file
+        raise ValueError(f'DBMS {args.dbms} is not supported!')
+
+
+def from_instance(args, instance):
+    """ Initialize DBMS object for local instance.
+    
+    Args:
+        args: dictionary containing command line arguments.
+        instance: local instance (replaces port and commands from args).
+    
+    Returns:
+        DBMS object.
+    """
+    instance_args = argparse.Namespace(**vars(args))
+    instance_args.restart_cmd = instance.restart_cmd
+    instance_args.recover_cmd = instance.recovery_cmd
+    return from_args(instance_args, instance.port)
+
+
+def replicas_from_args(args):
+    """ Initialize DBMS objects for all replicas from command line arguments.
+    
+    Args:
+        args: dictionary containing command line arguments.
+    
+    Returns:
+        list of DBMS objects, one per port in comma-separated replica ports.
+    """
+    if not args.replica_ports:
+        return []
+    ports = [int(p) for p in args.replica_ports.split(',')]
+    return [from_args(args, port) for port in ports]
\ No newline at end of file
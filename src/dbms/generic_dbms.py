@@ -10,7 +10,7 @@ class ConfigurableDBMS(ABC):
     """ Represents a configurable database management system. """
     
     def __init__(self, db, user, password, unit_to_size,
-                 restart_cmd, recovery_cmd, timeout_s = 300):
+                 restart_cmd, recovery_cmd, timeout_s = 300, port = None):
         """ Initialize DB connection with given credentials. 
         
         Args:
@@ -21,13 +21,15 @@ class ConfigurableDBMS(ABC):
             restart_cmd: command for restarting server
             recovery_cmd: command for recovering database
             timeout_s: per-query timeout in seconds
+            port: port of database server (replaces {port} in commands)
         """
         self.db = db
         self.user = user
         self.password = password
         self.unit_to_size = unit_to_size
-        self.restart_cmd = restart_cmd
-        self.recovery_cmd = recovery_cmd
+        self.port = port
+        self.restart_cmd = self._with_port(restart_cmd)
+        self.recovery_cmd = self._with_port(recovery_cmd)
         self.timeout_s = timeout_s
         self.config = {}
         self.failed_connections = 0
@@ -132,6 +134,14 @@ class ConfigurableDBMS(ABC):
         """ Disconnect from database. """
         pass
             
+    def _with_port(self, cmd):
+        """ Replaces {port} in command by port of database server. """
+        if cmd is None or '{port}' not in cmd:
+            return cmd
+        if self.port is None:
+            raise ValueError(f'Command "{cmd}" refers to unknown port')
+        return cmd.replace('{port}', str(self.port))
+            
     def _transform_val(self, value: str):
         """ Transforms parameter values using heuristic. """
         value = str(value)
@@ -0,0 +1,266 @@
+'''
+Manages local database server instances for isolated, parallel tuning.
+'''
+import atexit
+import dataclasses
+import glob
+import os
+import shlex
+import shutil
+import subprocess
+
+@dataclasses.dataclass(frozen=True)
+class LocalInstance():
+    """ Describes one local database server instance. """
+    port: int
+    data_dir: str
+    socket_dir: str
+    log_path: str
+    start_cmd: str
+    stop_cmd: str
+    restart_cmd: str
+    recovery_cmd: str
+
+class LocalInstancePool():
+    """ Creates, starts, and removes local Postgres or MariaDB servers.
+
+    Each instance uses its own data directory (cloned from a stopped
+    golden copy or newly initialized), port, socket directory, and log.
+    Restart and recovery commands are generated for each instance.
+    """
+
+    def __init__(
+            self, dbms_name, base_dir, nr_instances, base_port,
+            golden_dir=None, bin_dir=None, db=None, user=None, password=None):
+        """ Initializes pool (without creating instances).
+
+        Args:
+            dbms_name: 'pg' for Postgres or 'md' for MariaDB
+            base_dir: directory containing one sub-directory per instance
+            nr_instances: number of instances to create
+            base_port: instances listen on consecutive ports from here
+            golden_dir: clone this data directory (initialize if None)
+            bin_dir: directory containing server binaries (optional)
+            db: create this database when initializing (optional)
+            user: create this login when initializing (optional)
+            password: password of created login (MariaDB only)
+        """
+        if dbms_name not in ['pg', 'md']:
+            raise ValueError(f'No local instances for DBMS {dbms_name}!')
+        if golden_dir and _in_use(dbms_name, golden_dir):
+            raise ValueError(f'Stop server using {golden_dir} before cloning')
+        self.dbms_name = dbms_name
+        self.base_dir = os.path.abspath(base_dir)
+        self.nr_instances = nr_instances
+        self.base_port = base_port
+        self.golden_dir = golden_dir
+        self.bin_dir = bin_dir
+        self.db = db
+        self.user = user
+        self.password = password
+        self.instances = []
+
+    def __enter__(self):
+        """ Creates and starts instances. """
+        self.create()
+        return self
+
+    def __exit__(self, *_):
+        """ Stops and removes instances. """
+        self.teardown()
+
+    def create(self):
+        """ Creates data directories and starts all instances.
+
+        Returns:
+            list of started instances
+        """
+        for port in range(self.base_port, self.base_port + self.nr_instances):
+            instance = self._describe(port)
+            print(f'Creating instance in {instance.data_dir} on port {port}')
+            self._remove_leftovers(instance)
+            os.makedirs(instance.socket_dir, exist_ok=True)
+            if self.golden_dir:
+                shutil.copytree(
+                    self.golden_dir, instance.data_dir, symlinks=True)
+            else:
+                self._run(self._init_cmd(instance.data_dir))
+            if self.dbms_name == 'pg':
+                # Recovery restores parameter settings of the golden copy
+                auto_conf = os.path.join(
+                    instance.data_dir, 'postgresql.auto.conf')
+                if os.path.exists(auto_conf):
+                    shutil.copy(auto_conf, self._default_conf(port))
+                else:
+                    open(self._default_conf(port), 'w').close()
+            self._run(instance.start_cmd)
+            self.instances.append(instance)
+            if not self.golden_dir:
+                for cmd in self._setup_cmds(instance):
+                    self._run(cmd)
+        return self.instances
+
+    def teardown(self, remove_data=True):
+        """ Stops all instances, optionally removing their directories.
+
+        Args:
+            remove_data: whether to delete data directories
+        """
+        for instance in self.instances:
+            print(f'Stopping instance on port {instance.port}')
+            subprocess.run(instance.stop_cmd, shell=True)
+            if remove_data:
+                shutil.rmtree(
+                    self._instance_dir(instance.port), ignore_errors=True)
+        self.instances = []
+
+    def _binary(self, name):
+        """ Returns (quoted) path of server binary. """
+        if self.bin_dir:
+            return shlex.quote(os.path.join(self.bin_dir, name))
+        return name
+
+    def _default_conf(self, port):
+        """ Returns path to copy of default Postgres settings. """
+        return os.path.join(self._instance_dir(port), 'default.auto.conf')
+
+    def _describe(self, port):
+        """ Generates paths and commands for instance on given port.
+
+        Args:
+            port: instance listens on this port
+
+        Returns:
+            description of instance
+        """
+        inst_dir = self._instance_dir(port)
+        data_dir = os.path.join(inst_dir, 'data')
+        socket_dir = os.path.join(inst_dir, 'socket')
+        log_path = os.path.join(inst_dir, 'server.log')
+        data, log = [shlex.quote(p) for p in [data_dir, log_path]]
+        if self.dbms_name == 'pg':
+            pg_ctl = f'{self._binary("pg_ctl")} -D {data} -w'
+            options = shlex.quote(f'-p {port} -k {shlex.quote(socket_dir)}')
+            start_cmd = f'{pg_ctl} -l {log} -o {options} start'
+            stop_cmd = f'{pg_ctl} -m fast stop'
+            restart_cmd = f'{pg_ctl} -l {log} -o {options} restart'
+            default_conf = shlex.quote(self._default_conf(port))
+            auto_conf = shlex.quote(
+                os.path.join(data_dir, 'postgresql.auto.conf'))
+            recovery_cmd = f'cp {default_conf} {auto_conf}; {restart_cmd}'
+        else:
+            pid = shlex.quote(os.path.join(inst_dir, 'mariadb.pid'))
+            sock = shlex.quote(os.path.join(socket_dir, 'mariadb.sock'))
+            start_cmd = \
+                f'nohup {self._binary("mariadbd")} --no-defaults ' \
+                f'--datadir={data} --port={port} --socket={sock} ' \
+                f'--pid-file={pid} --log-error={log} > /dev/null 2>&1 & ' \
+                f'{self._binary("mariadb-admin")} --no-defaults ' \
+                f'--socket={sock} --wait=30 ping > /dev/null'
+            # Pid files of crashed servers are left behind
+            stop_cmd = \
+                f'if [ -e {pid} ]; then kill $(cat {pid}) 2> /dev/null; fi; ' \
+                f'while [ -e {pid} ] && kill -0 $(cat {pid}) 2> /dev/null; ' \
+                f'do sleep 0.5; done; rm -f {pid}'
+            restart_cmd = f'{stop_cmd}; {start_cmd}'
+            # Parameter settings are not persistent
+            recovery_cmd = restart_cmd
+        return LocalInstance(
+            port, data_dir, socket_dir, log_path, start_cmd,
+            stop_cmd, restart_cmd, recovery_cmd)
+
+    def _init_cmd(self, data_dir):
+        """ Returns command initializing empty data directory. """
+        data = shlex.quote(data_dir)
+        if self.dbms_name == 'pg':
+            user = f' -U {shlex.quote(self.user)}' if self.user else ''
+            return f'{self._binary("initdb")} -D {data} --auth=trust{user}'
+        else:
+            return f'{self._binary("mariadb-install-db")} ' \
+                f'--no-defaults --datadir={data}'
+
+    def _setup_cmds(self, instance):
+        """ Returns commands creating database and login after initialization.
+        
+        Args:
+            instance: newly initialized (and started) instance
+        
+        Returns:
+            list of shell commands
+        """
+        if not self.db:
+            return []
+        db = shlex.quote(self.db)
+        if self.dbms_name == 'pg':
+            user = f' -U {shlex.quote(self.user)}' if self.user else ''
+            socket = shlex.quote(instance.socket_dir)
+            return [f'{self._binary("createdb")} -h {socket} ' \
+                    f'-p {instance.port}{user} {db}']
+        sql = f'create database if not exists {self.db};'
+        if self.user:
+            login = f"'{self.user}'@'%'"
+            sql += f" create user if not exists {login} " \
+                f"identified by '{self.password or ''}';" \
+                f" grant all privileges on *.* to {login};"
+        sock = shlex.quote(os.path.join(instance.socket_dir, 'mariadb.sock'))
+        # Initialization grants socket-based access to the OS user
+        return [f'{self._binary("mariadb")} --no-defaults --socket={sock} ' \
+                f'-u "$(id -un)" -e {shlex.quote(sql)}']
+    
+    def _instance_dir(self, port):
+        """ Returns directory of instance on given port. """
+        return os.path.join(self.base_dir, f'instance_{port}')
+
+    def _remove_leftovers(self, instance):
+        """ Stops and removes instance left behind by an earlier run.
+
+        Args:
+            instance: description of instance about to be created
+        """
+        inst_dir = self._instance_dir(instance.port)
+        if os.path.exists(inst_dir):
+            print(f'Removing instance left behind in {inst_dir}')
+            if os.path.exists(instance.data_dir):
+                subprocess.run(instance.stop_cmd, shell=True)
+            shutil.rmtree(inst_dir)
+
+    def _run(self, cmd):
+        """ Runs shell command, raising an exception if it fails. """
+        print(f'Running "{cmd}"')
+        subprocess.run(cmd, shell=True, check=True)
+
+def _in_use(dbms_name, data_dir):
+    """ Returns True iff a server seems to be running on data directory.
+
+    Args:
+        dbms_name: 'pg' for Postgres or 'md' for MariaDB
+        data_dir: data directory of server
+
+    Returns:
+        True iff pid file or socket of running server is found
+    """
+    if dbms_name == 'pg':
+        return os.path.exists(os.path.join(data_dir, 'postmaster.pid'))
+    patterns = ['*.pid', '*.sock']
+    return any(glob.glob(os.path.join(data_dir, p)) for p in patterns)
+
+def from_args(args):
+    """ Creates and starts local instances as specified on command line.
+
+    Instances are stopped and removed when the interpreter exits.
+
+    Args:
+        args: dictionary containing command line arguments
+
+    Returns:
+        pool of started instances or None if no instances are requested
+    """
+    if not args.local_instances:
+        return None
+    pool = LocalInstancePool(
+        args.dbms, args.instance_dir, args.local_instances,
+        args.instance_port, args.golden_dir, args.db_bin_dir, 
+        args.db_name, args.db_user, args.db_pwd)
+    atexit.register(pool.teardown)
+    pool.create()
+    return pool
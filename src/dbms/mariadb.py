@@ -4,6 +4,7 @@ Created on Nov 8, 2023
 @author: tobiasdick
 '''
 from dbms.generic_dbms import ConfigurableDBMS
+from parameters.catalog import ParameterCatalog
 
 import mariadb
 import os
@@ -14,7 +15,7 @@ class MariaDBconfig(ConfigurableDBMS):
         is nearly identical to the representation of MySQL. """
     
     def __init__(self, db, user, password, 
-                 restart_cmd, recovery_cmd, timeout_s = 300):
+                 restart_cmd, recovery_cmd, timeout_s = 300, port = 3306):
         """ Initialize DB connection with given credentials. 
         
         Args:
@@ -24,14 +25,16 @@ class MariaDBconfig(ConfigurableDBMS):
             restart_cmd: command to restart server
             recovery_cmd: command to recover database
             timeout_s: per-query timeout in seconds
+            port: port of database server
         """
         unit_to_size={'KB':'*1024', 'MB':'*1024*1024', 'GB':'*1024*1024*1024',
                       'K':'*1024', 'M':'*1024*1024', 'G':'*1024*1024*1024'}
         super().__init__(db, user, password, unit_to_size,
-                         restart_cmd, recovery_cmd, timeout_s)
+                         restart_cmd, recovery_cmd, timeout_s, port)
         self.global_vars = [t[0] for t in self.query_all(
             'show global variables') if is_numerical(t[1])]
         self.all_variables = self.global_vars
+        self.param_catalog = ParameterCatalog(self.all_variables)
             
         print(f'Global variables: {self.global_vars}')
         print(f'All parameters: {self.all_variables}')
@@ -62,8 +65,8 @@ class MariaDBconfig(ConfigurableDBMS):
         
     def copy_db(self, source_db, target_db):
         """ Copy source to target database. """
-        mdb_clc_prefix = f'mariadb -u{self.user} -p{self.password} '
-        mdb_dump_prefix = f'mariadb-dump -u{self.user} -p{self.password} '
+        mdb_clc_prefix = f'mariadb -u{self.user} -p{self.password} -P{self.port} --protocol=TCP '
+        mdb_dump_prefix = f'mariadb-dump -u{self.user} -p{self.password} -P{self.port} --protocol=TCP '
         os.system(mdb_dump_prefix + f' {source_db} > copy_db_dump')
         print('Dumped old database')
         os.system(mdb_clc_prefix + f" -e 'drop database if exists {target_db}'")
@@ -84,7 +87,7 @@ class MariaDBconfig(ConfigurableDBMS):
         try:
             self.connection = mariadb.connect(
                 database=self.db, user=self.user, 
-                password=self.password, host="0.0.0.0", port=3306)
+                password=self.password, host="0.0.0.0", port=self.port)
             self.set_timeout(self.timeout_s)
             self.failed_connections = 0
             return True
@@ -161,7 +164,7 @@ class MariaDBconfig(ConfigurableDBMS):
     
     def is_param(self, param):
         """ Returns True iff the given parameter can be configured. """
-        return param in self.all_variables
+        return param in self.param_catalog
     
     def get_value(self, param):
         """ Returns current value for given parameter. """
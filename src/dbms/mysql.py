@@ -4,6 +4,7 @@ Created on Apr 7, 2021
 @author: immanueltrummer
 '''
 from dbms.generic_dbms import ConfigurableDBMS
+from parameters.catalog import ParameterCatalog
 
 import mysql.connector
 import os
@@ -14,7 +15,7 @@ class MySQLconfig(ConfigurableDBMS):
     """ Represents configurable MySQL database. """
     
     def __init__(self, db, user, password, 
-                 restart_cmd, recovery_cmd, timeout_s = 300):
+                 restart_cmd, recovery_cmd, timeout_s = 300, port = 3306):
         """ Initialize DB connection with given credentials. 
         
         Args:
@@ -24,11 +25,12 @@ class MySQLconfig(ConfigurableDBMS):
             restart_cmd: command to restart server
             recovery_cmd: command to recover database
             timeout_s: per-query timeout in seconds
+            port: port of database server
         """
         unit_to_size={'KB':'000', 'MB':'000000', 'GB':'000000000',
                       'K':'000', 'M':'000000', 'G':'000000000'}
         super().__init__(db, user, password, unit_to_size, 
-                         restart_cmd, recovery_cmd, timeout_s)
+                         restart_cmd, recovery_cmd, timeout_s, port)
         self.global_vars = [t[0] for t in self.query_all(
             'show global variables') if is_numerical(t[1])]
         self.server_cost_params = [t[0] for t in self.query_all(
@@ -37,6 +39,7 @@ class MySQLconfig(ConfigurableDBMS):
             'select cost_name from mysql.engine_cost')]
         self.all_variables = self.global_vars + \
             self.server_cost_params + self.engine_cost_params
+        self.param_catalog = ParameterCatalog(self.all_variables)
             
         print(f'Global variables: {self.global_vars}')
         print(f'Server cost parameters: {self.server_cost_params}')
@@ -69,8 +72,8 @@ class MySQLconfig(ConfigurableDBMS):
         
     def copy_db(self, source_db, target_db):
         """ Copy source to target database. """
-        ms_clc_prefix = f'mysql -u{self.user} -p{self.password} '
-        ms_dump_prefix = f'mysqldump -u{self.user} -p{self.password} '
+        ms_clc_prefix = f'mysql -u{self.user} -p{self.password} -P{self.port} --protocol=TCP '
+        ms_dump_prefix = f'mysqldump -u{self.user} -p{self.password} -P{self.port} --protocol=TCP '
         os.system(ms_dump_prefix + f' {source_db} > copy_db_dump')
         print('Dumped old database')
         os.system(ms_clc_prefix + f" -e 'drop database if exists {target_db}'")
@@ -91,7 +94,7 @@ class MySQLconfig(ConfigurableDBMS):
         try:
             self.connection = mysql.connector.connect(
                 database=self.db, user=self.user, 
-                password=self.password, host="localhost")
+                password=self.password, host="localhost", port=self.port)
             self.set_timeout(self.timeout_s)
             self.failed_connections = 0
             return True
@@ -166,7 +169,7 @@ class MySQLconfig(ConfigurableDBMS):
     
     def is_param(self, param):
         """ Returns True iff the given parameter can be configured. """
-        return param in self.all_variables
+        return param in self.param_catalog
     
     def get_value(self, param):
         """ Returns current value for given parameter. """
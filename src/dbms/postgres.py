@@ -4,6 +4,7 @@ Created on Apr 2, 2021
 @author: immanueltrummer
 '''
 from dbms.generic_dbms import ConfigurableDBMS
+from parameters.catalog import ParameterCatalog
 import os
 import psycopg2
 import time
@@ -12,7 +13,7 @@ class PgConfig(ConfigurableDBMS):
     """ Reconfigurable Postgres DBMS instance. """
     
     def __init__(self, db, user, password, restart_cmd, 
-                 recovery_cmd, timeout_s = 300):
+                 recovery_cmd, timeout_s = 300, port = 5432):
         """ Initialize DB connection with given credentials. 
         
         Args:
@@ -22,6 +23,7 @@ class PgConfig(ConfigurableDBMS):
             restart_cmd: command for restarting server
             recovery_cmd: command for recovering DB
             timeout_s: per-query timeout in seconds
+            port: port of database server
         """
         unit_to_size={'KB':'*1024', 'MB':'*1024*1024', 'GB':'*1024*1024*1024',
                       'kb':'*1024', 'mb':'*1024*1024', 'gb':'*1024*1024*1024',
@@ -29,8 +31,9 @@ class PgConfig(ConfigurableDBMS):
                       'K':'*1024', 'M':'*1024*1024', 'G':'*1024*1024*1024',
                       'k':'*1024', 'm':'*1024*1024', 'g':'*1024*1024*1024'}
         super().__init__(db, user, password, unit_to_size, 
-                         restart_cmd, recovery_cmd, timeout_s)
+                         restart_cmd, recovery_cmd, timeout_s, port)
         self.all_variables = self._query_params()
+        self.param_catalog = ParameterCatalog(self.all_variables)
         
     @classmethod
     def from_file(cls, config):
@@ -72,7 +75,7 @@ class PgConfig(ConfigurableDBMS):
         try:            
             self.connection = psycopg2.connect(
                 database = self.db, user = self.user, 
-                password = self.password, host = "localhost")
+                password = self.password, host = "localhost", port = self.port)
             self.set_timeout(self.timeout_s)
             self.failed_connections = 0
             return True
@@ -144,7 +147,7 @@ class PgConfig(ConfigurableDBMS):
     
     def is_param(self, param):
         """ Returns True iff given parameter exists. """
-        return param in self.all_variables
+        return param in self.param_catalog
         
     def get_value(self, param):
         """ Get current value of given parameter. """
@@ -0,0 +1,89 @@
+'''
+Persistent, content-addressed storage for extracted tuning hints.
+'''
+from doc.hint_table import HintTable
+import hashlib
+import json
+import os
+import pickle
+
+class HintCache():
+    """ Stores hints extracted from document collections on disk. 
+    
+    The hint table is stored in separate files and memory-mapped when
+    loading, all other extraction results are pickled.
+    """
+    
+    def __init__(self, cache_dir):
+        """ Initializes cache in given directory.
+        
+        Args:
+            cache_dir: directory storing cache entries (created if needed)
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def key(self, docs_path, settings):
+        """ Computes key identifying the outcome of hint extraction.
+        
+        Args:
+            docs_path: path to file containing tuning documents
+            settings: dictionary describing all other extraction inputs
+        
+        Returns:
+            hexadecimal hash over document content and settings
+        """
+        hasher = hashlib.sha256()
+        with open(docs_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                hasher.update(block)
+        hasher.update(json.dumps(settings, sort_keys=True).encode())
+        return hasher.hexdigest()
+    
+    def load(self, key):
+        """ Loads cached extraction state if available.
+        
+        Args:
+            key: key of cache entry
+        
+        Returns:
+            dictionary with extraction state or None if not cached
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as file:
+                state = pickle.load(file)
+            if os.path.exists(f'{path}.npy'):
+                state['hints'] = HintTable.load(path)
+            return state
+        except Exception as e:
+            print(f'Ignoring unreadable cache entry {path}: {e}')
+            return None
+    
+    def store(self, key, state):
+        """ Stores extraction state under given key.
+        
+        Args:
+            key: key of cache entry
+            state: dictionary with extraction state
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        state = dict(state)
+        hints = state.pop('hints', None)
+        if hints is not None:
+            hints.save(tmp_path)
+            for ext in ['npy', 'json']:
+                os.replace(f'{tmp_path}.{ext}', f'{path}.{ext}')
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        # Readers never observe partially written entries (the
+        # pickled state is written last and marks complete entries).
+        os.replace(tmp_path, path)
+        print(f'Stored extracted hints in {path}')
+    
+    def _path(self, key):
+        """ Returns path of file storing entry with given key. """
+        return os.path.join(self.cache_dir, f'{key}.hints')
@@ -4,84 +4,55 @@ Created on Apr 3, 2021
 @author: immanueltrummer
 '''
 from collections import Counter, defaultdict
-from dataclasses import dataclass
-from doc.util import get_parameters, get_values
-from parameters.util import decompose_val
-import enum
-import models.util
-import pandas as pd
+from doc.cache import HintCache
+from doc.hint_table import HintTable, HintType, TuningHint
+from doc.util import get_parameters, get_values, read_documents, split_passages
+import itertools
+import models.backend
+import models.registry
+import multiprocessing
 import parameters.util
 import re
 import torch
 import nlp.nlp_util
+import nlp.qa
+import nlp.zero_shot
 from dbms.generic_dbms import ConfigurableDBMS
-from sentence_transformers import SentenceTransformer, util
-from transformers import pipeline
-from typing import Any
+from nlp.similarity import SimilarityIndex
 
-class HintType(enum.IntEnum):
-    """ Represents the type of tuning hint. """
-    DISK_RATIO=0,
-    RAM_RATIO=1,
-    CORES_RATIO=2,
-    ABSOLUTE=3
-    
-    def __str__(self):
-        """ Return string representation of value. """
-        return [
-            'Relative (disk)', 'Relative (RAM)', 
-            'Relative (Cores)', 'Absolute Value'][self]
+# Collection processed by worker processes (inherited when forking)
+_worker_docs = None
+
+def _init_worker():
+    """ Avoids oversubscribing cores with intra-op threads of workers. """
+    torch.set_num_threads(1)
+
+def _run_worker_task(task):
+    """ Applies collection method to document in worker process.
+    
+    Args:
+        task: tuple of method name and document ID
+    
+    Returns:
+        result of method invocation
+    """
+    method, doc_id = task
+    return getattr(_worker_docs, method)(doc_id)
 
-@dataclass
-class TuningHint():
-    """ Represents a single tuning hint, assigning a parameter to a value. """
-    doc_id: str
-    param: Any
-    value: Any
-    recommendation: str
-    passage: str
-    float_val: float
-    val_unit: str
-    hint_type: HintType
-    
-    def __init__(
-            self, doc_id, passage, recommendation, 
-            param, value, hint_type):
-        """ Initializes tuning hint for given passage. 
-        
-        Args:
-            doc_id: document from which hint was extracted
-            passage: A text passage containing the hint.
-            param: match object referencing parameter in passage.
-            recommendation: text passage with recommended value.
-            value: match object referencing value in passage.
-            hint_type: type of tuning hint.
-        """
-        self.doc_id = doc_id
-        self.passage = passage
-        self.recommendation = recommendation
-        self.param = param
-        self.value = value
-        self.float_val, self.val_unit = decompose_val(value.group())
-        self.hint_type = hint_type
-            
 class DocCollection():
     """ Represents a collection of documents with tuning hints. """
-    qa_pipeline = pipeline(
-        'question-answering', 
-        model='deepset/roberta-base-squad2', 
-        tokenizer='deepset/roberta-base-squad2', 
-        device=models.util.torch_device(),
-        padding="longest")
-    zsc_pipeline = pipeline(
-        'zero-shot-classification', 
-        model='facebook/bart-large-mnli', 
-        tokenizer='facebook/bart-large-mnli', 
-        device=models.util.torch_device(),
-        padding="longest")
+    qa_model = 'deepset/roberta-base-squad2'
+    zsc_model = 'facebook/bart-large-mnli'
+    implicit_model = 'paraphrase-distilroberta-base-v1'
+    zsc_template = 'This example is {}.'
+    zsc_resources = ['Disk', 'RAM', 'Cores']
+    # Increment after changes affecting extracted hints to invalidate caches
+    cache_version = 6
 
     def __init__(self, docs_path, dbms:ConfigurableDBMS, 
-                 size_threshold, filter_params, use_implicit):
+                 size_threshold, filter_params, use_implicit, batch_size=8,
+                 cache_dir=None, implicit_k=1, nr_workers=1, lazy=False,
+                 chunk_size=10000):
         """ Reads tuning passages from a file. 
         
         Reads passages containing tuning hints from a text. Tries
@@ -94,9 +65,16 @@ class DocCollection():
             size_threshold: start new passage after so many tokens.
             filter_params: whether to filter hints by their parameters.
             use_implicit: whether to consider implicit hints.
+            batch_size: number of inputs per language model invocation.
+            cache_dir: directory for caching extracted hints (optional).
+            implicit_k: number of implicit parameters added per passage.
+            nr_workers: number of processes processing documents.
+            lazy: whether to extract hints only when they are requested.
+            chunk_size: number of document rows read from file at once.
         """
         self.dbms = dbms
         self.size_threshold = size_threshold
+        self.batch_size = batch_size
         self.filter_params = True if filter_params == 1 else False
         print(f'Discard text passages without at least one ' \
               f'explicit parameter reference: ' \
@@ -104,89 +82,224 @@ class DocCollection():
         self.use_implicit = True if use_implicit == 1 else False
         print(f'Try to infer implicit parameter references: ' \
               f'{self.use_implicit} ({use_implicit})')
-        self._prepare_implicit()        
+        self.implicit_k = implicit_k
+        self.nr_workers = nr_workers
+        if nr_workers > 1 and torch.cuda.is_available():
+            print('Processing documents sequentially on GPU')
+            self.nr_workers = 1
         
-        self.docs = pd.read_csv(docs_path)
-        self.docs.fillna('', inplace=True)
-        self.nr_docs = self.docs['filenr'].max()
-        self.nr_passages = []
-        self.passages_by_doc = []
-        for doc_id in range(self.nr_docs):
-            passages = self._doc_passages(doc_id+1)
-            if self.filter_params:
-                passages = self._filter_passages(passages)
-            self.passages_by_doc.append(passages)
-            self.nr_passages.append(len(passages))
-        # Prepare caching of tuning hints
-        self.doc_to_hints = {}
-        # Calculate statistics
-        self.asg_counts, self.param_counts = self._assignment_stats()
-        # Sort hints by parameter
-        self.param_to_hints = self._hints_by_param()
-        # Output a summary of data read
-        print(f'Initializing documents from file {docs_path} ...')
-        print('Sample of tuning hints:')
-        print(self.docs.sample())
+        self.lazy = lazy
+        self.zsc_memo = {}
+        
+        self.cache = HintCache(cache_dir) if cache_dir else None
+        if self.cache:
+            self.cache_key = self.cache.key(docs_path, self._cache_settings())
+            state = self.cache.load(self.cache_key)
+        else:
+            state = None
+        
+        if state is not None:
+            print(f'Loading hints for {docs_path} from cache ...')
+            self._set_state(state)
+        else:
+            self._prepare_implicit()
+            print(f'Initializing documents from file {docs_path} ...')
+            self.passages_by_doc = self._read_docs(docs_path, chunk_size)
+            self.nr_docs = len(self.passages_by_doc)
+            self.nr_passages = [len(p) for p in self.passages_by_doc]
+            # Prepare caching of tuning hints
+            self.hints = HintTable()
+            self.doc_to_hints = {}
+            # Statistics are updated as documents are processed
+            self.nr_processed = 0
+            self.asg_counts = Counter()
+            self.param_counts = Counter()
+            self.param_to_hints = defaultdict(lambda: [])
+            if not self.lazy:
+                self.extract_next(self.nr_docs)
         print(f'Nr. documents read: {self.nr_docs}')
         print(f'Nr. passages by doc: {self.nr_passages}')
         print(f'Nr. mentions per assignment: {self.asg_counts.most_common()}')
         print(f'Nr. documents per parameter: {self.param_counts.most_common()}')
 
-    def _doc_passages(self, doc_id):
-        """ Extract text snippets from given document. """ 
-        snippets_idx = self.docs['filenr'] == doc_id
-        snippets = self.docs.loc[snippets_idx, 'sentence']
-        # Join snippets into larger passages
-        passages = []
-        passage = []
-        p_length = 0
-        for snippet in snippets:
-            s_length = nlp.nlp_util.tokenize(snippet)['input_ids'].shape[1]
-            p_length += s_length
-            if p_length > self.size_threshold:
-                # Start new passage
-                passages.append('\n'.join(passage))
-                passage = [snippet]
-                p_length = 0
-            else:
-                # Append snippet to passage
-                passage.append(snippet)
-                p_length += s_length
-        return passages
+    @property
+    def qa_pipeline(self):
+        """ Question answering pipeline, extracting recommended values. """
+        return models.registry.get_pipeline('question-answering', self.qa_model)
     
-    def _enrich_passage(self, passage):
-        """ Add implicit parameters and values to passage. """
-        e = self.transformer.encode([passage], convert_to_tensor=True)[0]
-        max_sim = -1
-        max_param = None
-        for p, p_e in zip(self.all_params, self.p_embeddings):
-            sim = util.pytorch_cos_sim(e.unsqueeze(0), p_e.unsqueeze(0))[0][0]
-            if sim > max_sim:
-                max_sim = sim
-                max_param = p
-        if max_param:
-            passage += f' {max_param} '
-        # TODO: reconsider this after adding NLP-based value extraction step
-        # passage += '\n1 0'
-        return passage
+    @property
+    def transformer(self):
+        """ Sentence transformer, inferring implicit parameter references. """
+        return models.registry.get_sentence_transformer(self.implicit_model)
+    
+    @property
+    def zsc_pipeline(self):
+        """ Zero-shot classification pipeline, classifying hint types. """
+        return models.registry.get_pipeline(
+            'zero-shot-classification', self.zsc_model)
+    
+    def _cache_settings(self):
+        """ Returns all inputs, except for documents, that affect hints. """
+        params = sorted(self.dbms.all_params()) if self.dbms else None
+        return {
+            'version': self.cache_version,
+            'backend': models.backend.default_backend,
+            'tokenizer': nlp.nlp_util.model_name,
+            'qa_model': self.qa_model,
+            'zsc_model': self.zsc_model,
+            'implicit_model': self.implicit_model,
+            'size_threshold': self.size_threshold,
+            'filter_params': self.filter_params,
+            'use_implicit': self.use_implicit,
+            'implicit_k': self.implicit_k,
+            'parameters': params}
+    
+    def _get_state(self):
+        """ Returns extraction results for persistent caching. """
+        return {
+            'nr_docs': self.nr_docs,
+            'nr_passages': self.nr_passages,
+            'passages_by_doc': self.passages_by_doc,
+            'hints': self.hints,
+            'doc_to_hints': {d:[h.idx for h in hints] 
+                             for d, hints in self.doc_to_hints.items()},
+            'asg_counts': self.asg_counts,
+            'param_counts': self.param_counts}
+    
+    def _set_state(self, state):
+        """ Restores extraction results from cached state. """
+        self.nr_docs = state['nr_docs']
+        self.nr_passages = state['nr_passages']
+        self.passages_by_doc = state['passages_by_doc']
+        self.hints = state['hints']
+        self.doc_to_hints = {}
+        self.param_to_hints = defaultdict(lambda: [])
+        for doc_id in range(self.nr_docs):
+            hints = [self.hints[i] for i in state['doc_to_hints'][doc_id]]
+            self.doc_to_hints[doc_id] = hints
+            for hint in hints:
+                self.param_to_hints[hint.param_name].append((doc_id, hint))
+        self.asg_counts = state['asg_counts']
+        self.param_counts = state['param_counts']
+        self.nr_processed = self.nr_docs
+    
+    def _imap_docs(self, method, doc_ids):
+        """ Lazily applies method to given documents, in parallel if enabled.
+        
+        Worker processes are forked from the current process (and thread)
+        when this method is called. They share model weights with it and
+        process one document per task. Workers keep processing later
+        documents while the caller consumes results for earlier ones.
+        
+        Args:
+            method: name of collection method taking a document ID
+            doc_ids: apply method to documents with those IDs
+        
+        Returns:
+            iterator over method results, ordered like document IDs
+        """
+        doc_ids = list(doc_ids)
+        if self.nr_workers <= 1 or len(doc_ids) <= 1:
+            return (getattr(self, method)(doc_id) for doc_id in doc_ids)
+        
+        global _worker_docs
+        _worker_docs = self
+        context = multiprocessing.get_context('fork')
+        pool = context.Pool(self.nr_workers, _init_worker)
+        tasks = [(method, doc_id) for doc_id in doc_ids]
+        return self._drain_pool(pool, pool.imap(
+            _run_worker_task, tasks, chunksize=1))
+    
+    def _drain_pool(self, pool, results):
+        """ Yields results of worker pool, terminating pool afterwards.
+        
+        Args:
+            pool: pool of worker processes
+            results: iterator over results of pool tasks
+        
+        Yields:
+            task results
+        """
+        global _worker_docs
+        try:
+            with pool:
+                yield from results
+        finally:
+            _worker_docs = None
+    
+    def _read_docs(self, docs_path, chunk_size):
+        """ Reads relevant passages from all documents in a file.
+        
+        The file is read in chunks. Sentences of a document are
+        discarded once the document is split into passages.
+        
+        Args:
+            docs_path: path to .csv file with documents
+            chunk_size: number of rows read at once
+        
+        Returns:
+            list of passages for each document (first document has number 1)
+        """
+        nr_to_passages = {}
+        nr_sentences = 0
+        for doc_nr, sentences in read_documents(docs_path, chunk_size):
+            nr_sentences += len(sentences)
+            lengths = nlp.nlp_util.token_lengths(sentences)
+            passages = split_passages(sentences, lengths, self.size_threshold)
+            if self.filter_params:
+                passages = self._filter_passages(passages)
+            nr_to_passages[doc_nr] = passages
+        print(f'Nr. sentences read: {nr_sentences}')
+        nr_docs = max(nr_to_passages, default=0)
+        return [nr_to_passages.get(doc_id+1, []) for doc_id in range(nr_docs)]
+    
+    def _enrich_passages(self, passages):
+        """ Add implicit parameters to passages.
+        
+        Passages are encoded in batches and compared to all parameter
+        embeddings at once, adding the most similar parameters.
+        
+        Args:
+            passages: list of passages to enrich
+        
+        Returns:
+            list of enriched passages (in same order)
+        """
+        enriched = []
+        chunk_size = self.param_index.chunk_size
+        for chunk_start in range(0, len(passages), chunk_size):
+            chunk = passages[chunk_start:chunk_start+chunk_size]
+            embeddings = self.transformer.encode(
+                chunk, batch_size=self.batch_size, convert_to_tensor=True)
+            top_params = self.param_index.top_k(embeddings, self.implicit_k)
+            for passage, params in zip(chunk, top_params):
+                if params:
+                    passage += f' {" ".join(params)} '
+                # TODO: reconsider this after adding NLP-based value extraction step
+                # passage += '\n1 0'
+                enriched.append(passage)
+        return enriched
     
     def _filter_passages(self, passages):
         """ Filter passages to potentially relevant ones. """
-        # Filter based on simple string matching (need parameters and values)
-        passages = [p for p in passages if get_parameters(p) and get_values(p)]
         # If available, use DBMS to filter to passages containing real parameters
         if self.dbms:
-            passages = [p for p in passages if any(
-                self.dbms.is_param(t) for t in get_parameters(p))]
+            catalog = self.dbms.param_catalog
+            passages = [p for p in passages if get_values(p) and catalog.find(p)]
+        else:
+            # Filter based on simple string matching (need parameters and values)
+            passages = [
+                p for p in passages if get_parameters(p) and get_values(p)]
         return passages
     
     def _prepare_implicit(self):
         """ Prepare extraction of implicit tuning hints. """
-        if self.use_implicit:
-            self.transformer = SentenceTransformer('paraphrase-distilroberta-base-v1')
+        if self.use_implicit and not hasattr(self, 'param_index'):
             self.all_params = self.dbms.all_params()
             self.p_embeddings = self.transformer.encode(
                 self.all_params, convert_to_tensor=True)
+            self.param_index = SimilarityIndex(
+                self.all_params, self.p_embeddings)
     
     def _preprocess_passage(self, passage):
         """ Pre-processes text of a passage for hint extraction.
@@ -213,112 +326,404 @@ class DocCollection():
         Returns:
             List of candidate tuning hints.
         """
-        if doc_id in self.doc_to_hints:
-            return self.doc_to_hints[doc_id]
+        if doc_id not in self.doc_to_hints:
+            self._extract_hints([doc_id])
+        return self.doc_to_hints[doc_id]
+    
+    def _doc_hint_table(self, doc_id):
+        """ Returns table with hints from given document.
+        
+        Worker processes return hints in this form since tables
+        are cheap to send to the parent process.
+        """
+        return self.hints.take([h.idx for h in self.get_hints(doc_id)])
+    
+    def _fetch_hints(self, doc_ids):
+        """ Makes hints available for given documents, in parallel if enabled.
+        
+        Hints extracted by worker processes are merged into the hint table.
+        Workers are started by the calling thread, before iteration.
+        
+        Args:
+            doc_ids: extract hints from documents with those IDs
+        
+        Returns:
+            iterator over document IDs, yielded once hints are available
+        """
+        doc_ids = list(doc_ids)
+        pending = [d for d in doc_ids if d not in self.doc_to_hints]
+        if self.nr_workers <= 1 or len(pending) <= 1:
+            return self._fetch_serially(doc_ids)
+        
+        # Load models before forking to share them with workers
+        self.qa_pipeline
+        self.zsc_pipeline
+        tables = self._imap_docs('_doc_hint_table', pending)
+        return self._merge_tables(doc_ids, tables)
+    
+    def _fetch_serially(self, doc_ids):
+        """ Yields document IDs after extracting their hints one by one. """
+        for doc_id in doc_ids:
+            self.get_hints(doc_id)
+            yield doc_id
+    
+    def _merge_tables(self, doc_ids, tables):
+        """ Merges hints extracted by worker processes into hint table.
+        
+        Args:
+            doc_ids: documents whose hints are requested
+            tables: iterator over hint tables of documents without hints
+        
+        Yields:
+            document IDs, once hints of the document are available
+        """
+        for doc_id in doc_ids:
+            if doc_id not in self.doc_to_hints:
+                idxs = self.hints.extend(next(tables))
+                self.doc_to_hints[doc_id] = [self.hints[i] for i in idxs]
+            yield doc_id
+    
+    def _passage_candidates(self, doc_id, passage, exp_passage):
+        """ Collects parameters to extract values for from given passage.
+        
+        Args:
+            doc_id: document containing the passage
+            passage: original text of passage
+            exp_passage: passage after adding implicit parameters
+        
+        Returns:
+            List of (document, passage, expanded passage, parameter, 
+            parameter span) tuples, one per referenced parameter.
+        """
+        exp_passage = self._preprocess_passage(exp_passage)
+        # Use first reference to each parameter
+        p_spans = {}
+        if self.filter_params and self.dbms:
+            for start, end, p_name in self.dbms.param_catalog.find(exp_passage):
+                p_spans.setdefault(p_name, (start, end))
         else:
+            for param in re.finditer(parameters.util.param_reg, exp_passage):
+                p_spans.setdefault(param.group(), param.span())
+        return [(doc_id, passage, exp_passage, p_name, p_span) 
+                for p_name, p_span in p_spans.items()]
+    
+    def _extract_hints(self, doc_ids):
+        """ Extracts tuning hints from given documents.
+        
+        All (parameter, passage) pairs of the given documents are collected
+        first and passed to the question answering model in batches.
+        
+        Args:
+            doc_ids: extract hints from documents with those IDs
+        """
+        doc_passages = []
+        for doc_id in doc_ids:
             print(f'Creating hints for document {doc_id}')
-            hints = []
-            passages = self.passages_by_doc[doc_id]
-            for passage in passages:
-                if self.use_implicit:
-                    exp_passage = self._enrich_passage(passage)
-                    # print(f'Enriched passage: {exp_passage}')
-                else:
-                    exp_passage = passage
-                
-                exp_passage = self._preprocess_passage(exp_passage)
-                params = re.finditer(parameters.util.param_reg, exp_passage)
-                p_names = set([p.group() for p in params])
-                for p_name in p_names:
-                    if not self.filter_params or self.dbms.is_param(p_name):
-                        answer, score = self._extract_value(p_name, exp_passage)
-                        if score > 0.05:
-                        # if score > 0:
-                            values = re.finditer(
-                                parameters.util.value_reg, answer)
-                            for value in values:
-                                hint_type = self._classify_hint(
-                                    p_name, passage, value)
-                                param = re.search(p_name, exp_passage)
-                                hint = TuningHint(
-                                    doc_id, exp_passage, answer, 
-                                    param, value, hint_type)
-                                hints.append(hint)
-                                print(f'Adding hint {hint} with confidence {score}')
-                        else:
-                            print(
-                                f'Excluding recommendation "{answer}" for ' \
-                                f'parameter "{p_name}" due to low confidence ' \
-                                f'({score})')
-            self.doc_to_hints[doc_id] = hints
-            return hints
+            self.doc_to_hints[doc_id] = []
+            doc_passages += [(doc_id, p) for p in self.passages_by_doc[doc_id]]
+        
+        passages = [p for _, p in doc_passages]
+        if self.use_implicit:
+            exp_passages = self._enrich_passages(passages)
+        else:
+            exp_passages = passages
+        candidates = []
+        for (doc_id, passage), exp_passage in zip(doc_passages, exp_passages):
+            candidates += self._passage_candidates(
+                doc_id, passage, exp_passage)
+        
+        answers = self._extract_values([(c[3], c[2]) for c in candidates])
+        found = []
+        for candidate, (answer, score) in zip(candidates, answers):
+            p_name = candidate[3]
+            if score > 0.05:
+            # if score > 0:
+                values = re.finditer(parameters.util.value_reg, answer)
+                for value in values:
+                    found.append((candidate, answer, value, score))
+            else:
+                print(
+                    f'Excluding recommendation "{answer}" for ' \
+                    f'parameter "{p_name}" due to low confidence ' \
+                    f'({score})')
+        
+        # Classify all hints together to batch zero-shot classification
+        hint_types = self._classify_hints(
+            [(c[3], c[1], v.group()) for c, _, v, _ in found])
+        for (candidate, answer, value, score), hint_type in zip(found, hint_types):
+            doc_id, _, exp_passage, p_name, (p_start, p_end) = candidate
+            idx = self.hints.add(
+                doc_id, exp_passage, answer, p_name, p_start, p_end, 
+                value.start(), value.end(), hint_type)
+            hint = self.hints[idx]
+            self.doc_to_hints[doc_id].append(hint)
+            print(f'Adding hint {hint} with confidence {score}')
+        
+    def extract_next(self, nr_docs):
+        """ Extracts hints from next documents and updates statistics.
+        
+        Args:
+            nr_docs: maximal number of documents to process
+        
+        Returns:
+            list of (document ID, hint) pairs from processed documents
+        """
+        end = min(self.nr_processed + nr_docs, self.nr_docs)
+        doc_ids = range(self.nr_processed, end)
+        self._extract_docs(doc_ids)
+        new_hints = []
+        for doc_id in doc_ids:
+            new_hints += self._add_doc_stats(doc_id)
+        return new_hints
+    
+    def _extract_docs(self, doc_ids):
+        """ Extracts hints from given documents unless available.
+        
+        Args:
+            doc_ids: extract hints from documents with those IDs
+        """
+        pending = [d for d in doc_ids if d not in self.doc_to_hints]
+        if self.nr_workers > 1:
+            list(self._fetch_hints(pending))
+        else:
+            # Extract hints for all documents at once to fill model batches
+            self._extract_hints(pending)
+    
+    def update(self, docs_path, chunk_size=10000):
+        """ Updates collection to a new version of the documents file.
+        
+        Hints are only extracted from documents whose passages are new
+        or have changed. Hints of changed or removed documents are
+        dropped and statistics are updated accordingly.
+        
+        Args:
+            docs_path: path to new version of document file
+            chunk_size: number of document rows read from file at once
+        
+        Returns:
+            IDs of new, changed, or removed documents
+        """
+        self._prepare_implicit()
+        print(f'Updating documents from file {docs_path} ...')
+        passages_by_doc = self._read_docs(docs_path, chunk_size)
+        nr_docs = len(passages_by_doc)
+        changed = [d for d in range(max(nr_docs, self.nr_docs)) if 
+                   d >= nr_docs or d >= self.nr_docs or 
+                   passages_by_doc[d] != self.passages_by_doc[d]]
+        print(f'New, changed, or removed documents: {changed}')
+        
+        touched_params = set()
+        for doc_id in changed:
+            if doc_id < self.nr_processed:
+                touched_params.update(self._remove_doc_stats(doc_id))
+            self.doc_to_hints.pop(doc_id, None)
+        self.nr_processed = min(self.nr_processed, nr_docs)
+        self.nr_docs = nr_docs
+        self.passages_by_doc = passages_by_doc
+        self.nr_passages = [len(p) for p in passages_by_doc]
+        if self.cache:
+            self.cache_key = self.cache.key(docs_path, self._cache_settings())
+        
+        # Documents counted before are counted again after extraction
+        recount = [d for d in changed if d < self.nr_processed]
+        self._extract_docs(recount)
+        for doc_id in recount:
+            touched_params.update(self._count_doc(doc_id))
+        for param in touched_params & self.param_to_hints.keys():
+            self.param_to_hints[param].sort(key=lambda h:h[0])
+        
+        nr_hints = sum(len(h) for h in self.doc_to_hints.values())
+        if 2 * nr_hints < len(self.hints):
+            self._compact_hints()
+        # Cache is updated once the last document is processed
+        if self.nr_processed == self.nr_docs:
+            if self.cache:
+                self.cache.store(self.cache_key, self._get_state())
+        elif not self.lazy:
+            self.extract_next(self.nr_docs)
+        return changed
+    
+    def _compact_hints(self):
+        """ Removes hints of dropped documents from the hint table. """
+        doc_ids = sorted(self.doc_to_hints)
+        old_idxs = [h.idx for d in doc_ids for h in self.doc_to_hints[d]]
+        self.hints = self.hints.take(old_idxs)
+        new_idx = 0
+        for doc_id in doc_ids:
+            nr_hints = len(self.doc_to_hints[doc_id])
+            self.doc_to_hints[doc_id] = [
+                self.hints[i] for i in range(new_idx, new_idx + nr_hints)]
+            new_idx += nr_hints
+        self.param_to_hints = defaultdict(lambda: [])
+        for doc_id in range(self.nr_processed):
+            for hint in self.doc_to_hints[doc_id]:
+                self.param_to_hints[hint.param_name].append((doc_id, hint))
+    
+    def hint_stream(self):
+        """ Returns hints document by document, extracting them on demand.
+        
+        Statistics include a document before its hints are yielded.
+        Hints from documents processed before are yielded first. Worker
+        processes (if enabled) are started by the calling thread.
         
+        Returns:
+            iterator over pairs of document ID and hint
+        """
+        processed = [
+            (doc_id, hint) for doc_id in range(self.nr_processed) 
+            for hint in self.doc_to_hints[doc_id]]
+        pending = range(self.nr_processed, self.nr_docs)
+        fetched = self._fetch_hints(pending)
+        return itertools.chain(processed, (
+            doc_hint for doc_id in fetched 
+            for doc_hint in self._add_doc_stats(doc_id)))
+    
+    def _add_doc_stats(self, doc_id):
+        """ Adds hints of next document to statistics.
+        
+        Args:
+            doc_id: ID of next document to process
+        
+        Returns:
+            list of (document ID, hint) pairs from this document
+        """
+        hints = self.doc_to_hints[doc_id]
+        doc_hints = [(doc_id, hint) for hint in hints]
+        if doc_id != self.nr_processed:
+            return doc_hints
+        self._count_doc(doc_id)
+        self.nr_processed += 1
+        if self.nr_processed == self.nr_docs and self.cache:
+            self.cache.store(self.cache_key, self._get_state())
+        return doc_hints
+    
+    def _doc_assignments(self, doc_id):
+        """ Returns sets of assignments and parameters in document hints. """
+        doc_asgs = set(
+            (h.param_name, h.value.group()) for h in self.doc_to_hints[doc_id])
+        doc_params = set(p for p, _ in doc_asgs)
+        return doc_asgs, doc_params
+    
+    def _count_doc(self, doc_id):
+        """ Adds hints of given document to statistics.
+        
+        Returns:
+            set of parameters mentioned in document hints
+        """
+        doc_asgs, doc_params = self._doc_assignments(doc_id)
+        for hint in self.doc_to_hints[doc_id]:
+            self.param_to_hints[hint.param_name].append((doc_id, hint))
+        self.asg_counts.update(doc_asgs)
+        self.param_counts.update(doc_params)
+        return doc_params
+    
+    def _remove_doc_stats(self, doc_id):
+        """ Removes hints of given document from statistics.
+        
+        Returns:
+            set of parameters mentioned in document hints
+        """
+        doc_asgs, doc_params = self._doc_assignments(doc_id)
+        for counter, keys in [
+                (self.asg_counts, doc_asgs), (self.param_counts, doc_params)]:
+            for key in keys:
+                counter[key] -= 1
+                if counter[key] <= 0:
+                    del counter[key]
+        for param in doc_params:
+            p_hints = [h for h in self.param_to_hints[param] if h[0] != doc_id]
+            if p_hints:
+                self.param_to_hints[param] = p_hints
+            else:
+                del self.param_to_hints[param]
+        return doc_params
+    
     def _assignment_stats(self):
         """ Generate statistics on candidate parameter assignments. """
-        asg_counter = Counter()
-        param_counter = Counter()
-        for doc_id in range(self.nr_docs):
-            doc_asgs = set()
-            doc_params = set()
-            hints = self.get_hints(doc_id)
-            for hint in hints:
-                asg = (hint.param.group(), hint.value.group())
-                doc_asgs.add(asg)
-                doc_params.add(asg[0])
-            for asg in doc_asgs:
-                asg_counter.update([asg])
-            for param in doc_params:
-                param_counter.update([param])
-        return asg_counter, param_counter
-    
-    def _classify_hint(self, p_name, passage, value):
-        """ Classifies hint depending on recommendation type.
+        self.extract_next(self.nr_docs)
+        return self.asg_counts, self.param_counts
+    
+    def _classify_hints(self, requests):
+        """ Classifies hints depending on recommendation type.
+        
+        Percentages are classified by zero-shot classification, run in
+        batches. Results are memoized by passage (ignoring differences in
+        white space), parameter, and value.
         
         Args:
-            p_name: name of parameter
-            passage: text recommending values
-            value: one specific recommended value
+            requests: list of (parameter, passage, value) tuples
+        
+        Returns:
+            list containing hint type for each request
         """
-        value_str = value.group()
-        if '%' in value_str:
-            resources = ['Disk', 'RAM', 'Cores']
-            labels = [f'{p_name}: {value_str} ({r})' for r in resources]
-            result = self.zsc_pipeline(passage, labels)
-            winner_label = result['labels'][0]
-            winner_idx = labels.index(winner_label)
-            if winner_idx == 0:
-                return HintType.DISK_RATIO
-            elif winner_idx == 1:
-                return HintType.RAM_RATIO
-            elif winner_idx == 2:
-                return HintType.CORES_RATIO
-            else:
-                raise ValueError(f'Unknown label "{winner_label}"')
-        else:
-            return HintType.ABSOLUTE
-
-    def _extract_value(self, p_name, passage):
-        """ Extracts recommended parameter value from passage.
+        hint_types = [HintType.ABSOLUTE] * len(requests)
+        key_to_idxs = defaultdict(lambda: [])
+        for idx, (p_name, passage, value_str) in enumerate(requests):
+            if '%' in value_str:
+                key = (' '.join(passage.split()), p_name, value_str)
+                if key in self.zsc_memo:
+                    hint_types[idx] = self.zsc_memo[key]
+                else:
+                    key_to_idxs[key].append(idx)
+        
+        keys = list(key_to_idxs.keys())
+        # Classify original passage of first request with each key
+        first_requests = [requests[key_to_idxs[key][0]] for key in keys]
+        winners = self._zero_shot_winners(
+            [(passage, p_name, value_str) 
+             for p_name, passage, value_str in first_requests])
+        resource_types = [
+            HintType.DISK_RATIO, HintType.RAM_RATIO, HintType.CORES_RATIO]
+        for key, winner_idx in zip(keys, winners):
+            hint_type = resource_types[winner_idx]
+            self.zsc_memo[key] = hint_type
+            for idx in key_to_idxs[key]:
+                hint_types[idx] = hint_type
+        return hint_types
+    
+    def _zero_shot_winners(self, inputs):
+        """ Determines most likely resource for percentage values.
+        
+        Scores all (passage, label) pairs with the entailment model
+        behind the zero-shot pipeline in batches. For single-label
+        classification, the pipeline's winner is the label with
+        maximal entailment logit.
+        
+        Args:
+            inputs: list of (passage, parameter, value) tuples
+        
+        Returns:
+            list with index of winning resource for each input
+        """
+        if not inputs:
+            return []
+        premises = []
+        hypotheses = []
+        for passage, p_name, value_str in inputs:
+            for r in self.zsc_resources:
+                premises.append(passage)
+                hypotheses.append(
+                    self.zsc_template.format(f'{p_name}: {value_str} ({r})'))
+        
+        batch_size = self.batch_size * len(self.zsc_resources)
+        entail_logits = nlp.zero_shot.entailment_logits(
+            self.zsc_pipeline, premises, hypotheses, batch_size)
+        entail_logits = entail_logits.view(
+            len(inputs), len(self.zsc_resources))
+        return entail_logits.argmax(dim=1).tolist()
+    
+    def _extract_values(self, pairs):
+        """ Extracts recommended parameter values from passages.
         
         Args:
-            p_name: name of parameter for which to extract values
-            passage: extract recommendations from this passage
+            pairs: list of (parameter name, passage) pairs
         
         Returns:
-            tuple: recommendation, confidence
+            list of (recommendation, confidence) tuples, one per pair
         """
-        question = f'Which values are recommended for {p_name}?'
-        qa_input = {'question': question, 'context': passage}
-        qa_result = self.qa_pipeline(qa_input)
-        answer = qa_result['answer']
-        score = qa_result['score']
-        return answer, score
-    
-    def _hints_by_param(self):
-        """ Maps parameters to corresponding hints. """
-        param_to_hints = defaultdict(lambda: [])
-        for doc_id, doc_hints in self.doc_to_hints.items():
-            for hint in doc_hints:
-                param = hint.param.group()
-                param_to_hints[param].append((doc_id, hint))
-        return param_to_hints
\ No newline at end of file
+        questions = [
+            f'Which values are recommended for {p_name}?' 
+            for p_name, _ in pairs]
+        passages = [passage for _, passage in pairs]
+        return nlp.qa.answer(
+            self.qa_pipeline, questions, passages, self.batch_size)
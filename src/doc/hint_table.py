@@ -0,0 +1,311 @@
+'''
+Compact, column-oriented storage of tuning hints.
+'''
+from parameters.util import decompose_val
+import enum
+import json
+import numpy as np
+
+class HintType(enum.IntEnum):
+    """ Represents the type of tuning hint. """
+    DISK_RATIO=0,
+    RAM_RATIO=1,
+    CORES_RATIO=2,
+    ABSOLUTE=3
+
+    def __str__(self):
+        """ Return string representation of value. """
+        return [
+            'Relative (disk)', 'Relative (RAM)',
+            'Relative (Cores)', 'Absolute Value'][self]
+
+# One row per hint, strings are stored as IDs into interned string pools
+ROW_TYPE = np.dtype([
+    ('doc_id', np.int32), ('passage', np.int32),
+    ('recommendation', np.int32), ('param', np.int32),
+    ('param_start', np.int32), ('param_end', np.int32),
+    ('value_start', np.int32), ('value_end', np.int32),
+    ('float_val', np.float64), ('unit', np.int32), ('hint_type', np.int8)])
+
+class Span():
+    """ Character span within a text, offering the match object interface. """
+    __slots__ = ('string', 'span_start', 'span_end')
+
+    def __init__(self, string, start, end):
+        """ Initializes span of given text.
+
+        Args:
+            string: text containing the span
+            start: index of first character in span
+            end: index after last character in span
+        """
+        self.string = string
+        self.span_start = start
+        self.span_end = end
+
+    def group(self):
+        """ Returns text covered by span. """
+        return self.string[self.span_start:self.span_end]
+
+    def start(self):
+        """ Returns index of first character in span. """
+        return self.span_start
+
+    def end(self):
+        """ Returns index after last character in span. """
+        return self.span_end
+
+    def span(self):
+        """ Returns tuple of start and end index. """
+        return self.span_start, self.span_end
+
+    def __repr__(self):
+        """ Return representation similar to match objects. """
+        return f'<Span span={self.span()}, match={self.group()!r}>'
+
+class TuningHint():
+    """ View on a single tuning hint, assigning a parameter to a value. """
+    __slots__ = ('table', 'idx')
+
+    def __init__(self, table, idx):
+        """ Initializes view on hint in given table.
+
+        Args:
+            table: hint table storing the hint
+            idx: row index of hint in table
+        """
+        self.table = table
+        self.idx = idx
+
+    @property
+    def doc_id(self):
+        """ Document from which hint was extracted. """
+        return int(self.table.rows[self.idx]['doc_id'])
+
+    @property
+    def passage(self):
+        """ Text passage containing the hint. """
+        return self.table.texts[self.table.rows[self.idx]['passage']]
+
+    @property
+    def recommendation(self):
+        """ Text passage with recommended value. """
+        return self.table.texts[self.table.rows[self.idx]['recommendation']]
+
+    @property
+    def param_name(self):
+        """ Name of parameter referenced by hint. """
+        return self.table.params[self.table.rows[self.idx]['param']]
+
+    @property
+    def param(self):
+        """ Span of parameter within passage. """
+        row = self.table.rows[self.idx]
+        return Span(
+            self.table.texts[row['passage']],
+            int(row['param_start']), int(row['param_end']))
+
+    @property
+    def value(self):
+        """ Span of recommended value within recommendation. """
+        row = self.table.rows[self.idx]
+        return Span(
+            self.table.texts[row['recommendation']],
+            int(row['value_start']), int(row['value_end']))
+
+    @property
+    def float_val(self):
+        """ Numerical part of recommended value (fraction for percentages). """
+        return float(self.table.rows[self.idx]['float_val'])
+
+    @property
+    def val_unit(self):
+        """ Unit of recommended value. """
+        return self.table.units[self.table.rows[self.idx]['unit']]
+
+    @property
+    def hint_type(self):
+        """ Type of tuning hint. """
+        return HintType(int(self.table.rows[self.idx]['hint_type']))
+
+    def __eq__(self, other):
+        """ Views are equal if they refer to the same hint. """
+        return isinstance(other, TuningHint) and \
+            self.table is other.table and self.idx == other.idx
+
+    def __hash__(self):
+        """ Hash consistent with equality. """
+        return hash((id(self.table), self.idx))
+
+    def __repr__(self):
+        """ Return description of all hint properties. """
+        return f'TuningHint(doc_id={self.doc_id}, param={self.param}, ' \
+            f'value={self.value}, recommendation={self.recommendation!r}, ' \
+            f'passage={self.passage!r}, float_val={self.float_val}, ' \
+            f'val_unit={self.val_unit!r}, hint_type={self.hint_type!r})'
+
+class HintTable():
+    """ Stores tuning hints in an array, with interned strings. """
+
+    def __init__(self, rows=None, texts=None, params=None, units=None):
+        """ Initializes table with given content (empty by default).
+
+        Args:
+            rows: array of rows with type ROW_TYPE
+            texts: pool of passages and recommendations
+            params: pool of parameter names
+            units: pool of value units
+        """
+        self.rows = np.zeros(0, dtype=ROW_TYPE) if rows is None else rows
+        self.size = len(self.rows)
+        self.texts = texts or []
+        self.params = params or []
+        self.units = units or []
+        self._ids = {}
+        for pool in [self.texts, self.params, self.units]:
+            self._ids[id(pool)] = {s:i for i, s in enumerate(pool)}
+
+    def __len__(self):
+        """ Returns number of hints in table. """
+        return self.size
+
+    def __getitem__(self, idx):
+        """ Returns view on hint with given index. """
+        if idx < 0 or idx >= self.size:
+            raise IndexError(f'No hint with index {idx}')
+        return TuningHint(self, idx)
+
+    def __iter__(self):
+        """ Iterates over views on all hints. """
+        return (TuningHint(self, idx) for idx in range(self.size))
+
+    def __getstate__(self):
+        """ Serializes used rows and string pools only. """
+        return {
+            'rows': np.array(self.rows[:self.size]), 'texts': self.texts,
+            'params': self.params, 'units': self.units}
+
+    def __setstate__(self, state):
+        """ Restores table from serialized state. """
+        self.__init__(**state)
+
+    def add(self, doc_id, passage, recommendation, param,
+            param_start, param_end, value_start, value_end, hint_type):
+        """ Adds a new hint to the table.
+
+        Args:
+            doc_id: document from which hint was extracted
+            passage: text passage containing the hint
+            recommendation: text passage with recommended value
+            param: name of parameter
+            param_start: start of parameter in passage
+            param_end: end of parameter in passage
+            value_start: start of value in recommendation
+            value_end: end of value in recommendation
+            hint_type: type of tuning hint
+
+        Returns:
+            index of new hint
+        """
+        float_val, unit = decompose_val(recommendation[value_start:value_end])
+        self._reserve(self.size + 1)
+        idx = self.size
+        self.rows[idx] = (
+            doc_id, self._intern(self.texts, passage),
+            self._intern(self.texts, recommendation),
+            self._intern(self.params, param), param_start, param_end,
+            value_start, value_end, float_val,
+            self._intern(self.units, unit), int(hint_type))
+        self.size += 1
+        return idx
+
+    def extend(self, other):
+        """ Appends all hints from another table.
+
+        Args:
+            other: copy hints from this table
+
+        Returns:
+            list of indexes of added hints
+        """
+        new_rows = np.array(other.rows[:other.size])
+        for column, src_pool, dest_pool in [
+                ('passage', other.texts, self.texts),
+                ('recommendation', other.texts, self.texts),
+                ('param', other.params, self.params),
+                ('unit', other.units, self.units)]:
+            id_map = np.array(
+                [self._intern(dest_pool, s) for s in src_pool], dtype=np.int32)
+            if len(new_rows):
+                new_rows[column] = id_map[new_rows[column]]
+        self._reserve(self.size + len(new_rows))
+        first = self.size
+        self.rows[first:first+len(new_rows)] = new_rows
+        self.size += len(new_rows)
+        return list(range(first, self.size))
+
+    def take(self, idxs):
+        """ Returns table containing hints with given indexes.
+
+        Args:
+            idxs: indexes of hints to copy
+
+        Returns:
+            new hint table
+        """
+        table = HintTable()
+        rows = np.array(self.rows[:self.size][list(idxs)])
+        for column, src_pool, dest_pool in [
+                ('passage', self.texts, table.texts),
+                ('recommendation', self.texts, table.texts),
+                ('param', self.params, table.params),
+                ('unit', self.units, table.units)]:
+            rows[column] = [
+                table._intern(dest_pool, src_pool[i]) for i in rows[column]]
+        table.rows = rows
+        table.size = len(rows)
+        return table
+
+    def save(self, path):
+        """ Saves table, the array can be memory-mapped when loading.
+
+        Args:
+            path: path prefix for files storing table
+        """
+        np.save(f'{path}.npy', self.rows[:self.size])
+        with open(f'{path}.json', 'w') as file:
+            json.dump({
+                'texts': self.texts, 'params': self.params,
+                'units': self.units}, file)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """ Loads table from files created by save.
+
+        Args:
+            path: path prefix for files storing table
+            mmap: whether to map hint array into memory instead of reading
+
+        Returns:
+            loaded hint table
+        """
+        rows = np.load(f'{path}.npy', mmap_mode='r' if mmap else None)
+        with open(f'{path}.json') as file:
+            pools = json.load(file)
+        return cls(rows, pools['texts'], pools['params'], pools['units'])
+
+    def _intern(self, pool, string):
+        """ Returns ID of string in pool, adding it if necessary. """
+        ids = self._ids[id(pool)]
+        if string not in ids:
+            ids[string] = len(pool)
+            pool.append(string)
+        return ids[string]
+
+    def _reserve(self, nr_rows):
+        """ Makes sure the row array can hold given number of rows. """
+        if nr_rows > len(self.rows) or not self.rows.flags.writeable:
+            capacity = max(nr_rows, 2 * len(self.rows), 16)
+            rows = np.zeros(capacity, dtype=ROW_TYPE)
+            rows[:self.size] = self.rows[:self.size]
+            self.rows = rows
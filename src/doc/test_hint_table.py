@@ -0,0 +1,41 @@
+'''
+Tests for column-oriented storage of tuning hints.
+'''
+from doc.hint_table import HintTable, HintType
+import os
+import pickle
+import tempfile
+import unittest
+
+class TestHintTable(unittest.TestCase):
+    """ Test hint table. """
+    
+    def test_hint_table(self):
+        """ Test adding, copying, and saving hints. """
+        table = HintTable()
+        passage = 'Set shared_buffers to 25% and work_mem to 64MB.'
+        table.add(
+            1, passage, '25%', 'shared_buffers', 4, 18, 0, 3, 
+            HintType.RAM_RATIO)
+        table.add(
+            2, passage, 'work_mem to 64MB', 'work_mem', 30, 38, 12, 16, 
+            HintType.ABSOLUTE)
+        self.assertEqual(len(table.texts), 3)
+        self.assertEqual(table[0].float_val, 0.25)
+        self.assertEqual(table[0].hint_type, HintType.RAM_RATIO)
+        self.assertEqual(table[1].param.group(), 'work_mem')
+        self.assertEqual(table[1].value.group(), '64MB')
+        self.assertEqual(table[1].val_unit, 'MB')
+        
+        merged = HintTable()
+        merged.extend(table.take([1]))
+        merged.extend(pickle.loads(pickle.dumps(table)))
+        self.assertEqual(
+            [merged[i].param.group() for i in range(len(merged))],
+            ['work_mem', 'shared_buffers', 'work_mem'])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'hints')
+            merged.save(path)
+            loaded = HintTable.load(path)
+            self.assertEqual(len(loaded), 3)
+            self.assertEqual(loaded[1].value.group(), '25%')
@@ -0,0 +1,38 @@
+'''
+Tests for reading and splitting documents.
+'''
+from doc.util import read_documents, split_passages
+import os
+import tempfile
+import unittest
+
+class TestDocUtil(unittest.TestCase):
+    """ Test document utility functions. """
+    
+    def test_split_passages(self):
+        """ Test joining snippets into passages of bounded length. """
+        snippets = ['a', 'b', 'c', 'd', 'e']
+        self.assertEqual(
+            split_passages(snippets, [1, 1, 1, 1, 1], 4), ['a\nb'])
+        self.assertEqual(
+            split_passages(snippets, [5, 1, 1, 1, 1], 4), ['', 'a\nb\nc'])
+        self.assertEqual(split_passages(snippets, [1] * 5, 100), [])
+    
+    def test_read_documents(self):
+        """ Test reading documents spanning multiple chunks. """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'docs.csv')
+            with open(path, 'w') as file:
+                file.write('filenr,sentence\n1,a\n1,b\n1,\n2,c\n4,d\n4,e\n')
+            for chunk_size in [1, 2, 10]:
+                self.assertEqual(
+                    list(read_documents(path, chunk_size)), 
+                    [(1, ['a', 'b', '']), (2, ['c']), (4, ['d', 'e'])])
+            with open(path, 'a') as file:
+                file.write('5,42\n5,1.0\n')
+            self.assertEqual(
+                list(read_documents(path, 2))[-1], (5, ['42', '1.0']))
+            with open(path, 'a') as file:
+                file.write('1,f\n')
+            with self.assertRaises(ValueError):
+                list(read_documents(path, 2))
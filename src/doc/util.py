@@ -3,6 +3,7 @@ Created on Apr 14, 2021
 
 @author: immanueltrummer
 '''
+import pandas as pd
 import re
 
 def get_values(sentence):
@@ -24,6 +25,70 @@ def get_parameters(sentence):
             candidates.append(s)
     return candidates
 
+def split_passages(snippets, lengths, size_threshold):
+    """ Joins consecutive snippets into passages of bounded length.
+    
+    Args:
+        snippets: text snippets in document order
+        lengths: number of tokens of each snippet
+        size_threshold: start new passage after so many tokens
+    
+    Returns:
+        list of passages (snippets separated by newlines)
+    """
+    passages = []
+    passage = []
+    p_length = 0
+    for snippet, s_length in zip(snippets, lengths):
+        p_length += s_length
+        if p_length > size_threshold:
+            # Start new passage
+            passages.append('\n'.join(passage))
+            passage = [snippet]
+            p_length = 0
+        else:
+            # Append snippet to passage
+            passage.append(snippet)
+            p_length += s_length
+    return passages
+
+def read_documents(docs_path, chunk_size=10000):
+    """ Reads documents from a file, one chunk of rows at a time.
+    
+    Rows of the same document must be stored consecutively. Only
+    the rows of the current chunk and of the current document are
+    kept in memory.
+    
+    Args:
+        docs_path: path to .csv file with filenr and sentence columns
+        chunk_size: number of rows read at once
+    
+    Yields:
+        pairs of document number and list of sentences in document
+    """
+    doc_nr = None
+    sentences = []
+    seen = set()
+    # Types inferred per chunk may differ (e.g., chunks with numbers only)
+    for chunk in pd.read_csv(
+            docs_path, usecols=['filenr', 'sentence'], 
+            dtype={'sentence':str}, chunksize=chunk_size):
+        chunk.fillna({'sentence':''}, inplace=True)
+        for row_nr, sentence in zip(chunk['filenr'], chunk['sentence']):
+            if row_nr != doc_nr:
+                if doc_nr is not None:
+                    yield doc_nr, sentences
+                if row_nr in seen:
+                    raise ValueError(
+                        f'Rows of document {row_nr} are not consecutive ' \
+                        f'in {docs_path} - sort by filenr first')
+                seen.add(row_nr)
+                doc_nr = row_nr
+                sentences = []
+            sentences.append(sentence)
+    if doc_nr is not None:
+        yield doc_nr, sentences
+
 def clean_sentence(sentence):
     """ Separate lower case letters, followed by upper case letters. """
     return re.sub(r'([a-z])([A-Z])', r'\1 \2', sentence)
\ No newline at end of file
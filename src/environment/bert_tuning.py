@@ -5,16 +5,17 @@ Created on Apr 30, 2021
 '''
 from doc.collection import DocCollection
 from environment.common import DecisionType, DocTuning
-from transformers import BertTokenizer
 from gym.spaces import Box
+import models.registry
 import numpy as np
 import torch
 
 class TuningBertFine(DocTuning):
     """ Fine-tune BERT to predict action values. """
+    tokenizer_model = 'bert-base-cased'
     
     def __init__(self, docs: DocCollection, hints_per_episode, 
-                 max_length, mask_params):
+                 max_length, mask_params, obs_dtype=np.int64):
         """ Initialize with given document collection. 
         
         Args:
@@ -22,13 +23,26 @@ class TuningBertFine(DocTuning):
             hints_per_episode: candidate hints until episode ends
             max_length: maximum number of tokens per snippet
             mask_params: whether to mask parameter names
+            obs_dtype: integer type of observations (e.g., np.int16)
         """
         super().__init__(docs, hints_per_episode)
         self.max_length = max_length
         self.mask_params = mask_params
+        self.obs_dtype = np.dtype(obs_dtype)
+        max_id = len(self.tokenizer) - 1
+        if max_id > np.iinfo(self.obs_dtype).max:
+            raise ValueError(
+                f'Token IDs up to {max_id} do not fit into {self.obs_dtype}')
         self.observation_space = Box(
-            low=0, high=100000, shape=(3, 5, max_length,), dtype=np.int64)
-        self.tokenizer = BertTokenizer.from_pretrained('bert-base-cased')
+            low=0, high=max_id, shape=(3, 5, max_length,), 
+            dtype=self.obs_dtype)
+        # Maps (passage, parameter, value, decision) to observation
+        self.encodings = {}
+    
+    @property
+    def tokenizer(self):
+        """ Tokenizer of BERT model (shared, loaded on first use). """
+        return models.registry.get_tokenizer(self.tokenizer_model)
 
     def _mask(self, strings, param):
         """ Mask occurrence of parameter in string array. 
@@ -46,17 +60,35 @@ class TuningBertFine(DocTuning):
             _, hint = self.hints[self.hint_ctr]
         else:
             _, hint = self.hints[0]
-        passage_cps = [hint.passage for _ in range(5)]
         param = hint.param.group()
         value = hint.value.group()
-        if self.decision == DecisionType.PICK_BASE:
+        key = (hint.passage, param, value, int(self.decision))
+        if key not in self.encodings:
+            self.encodings[key] = self._encode(
+                hint.passage, param, value, self.decision)
+        return self.encodings[key]
+    
+    def _encode(self, passage, param, value, decision):
+        """ Encodes passage, paired with choices for given decision.
+        
+        Args:
+            passage: text passage containing hint
+            param: parameter referenced in hint
+            value: value recommended in hint
+            decision: type of decision to make
+        
+        Returns:
+            tensor of shape (3, 5, max_length): token IDs, token types, mask
+        """
+        passage_cps = [passage for _ in range(5)]
+        if decision == DecisionType.PICK_BASE:
             choices = [
                 f'{param} and {value} relate to main memory.',
                 f'{param} and {value} relate to hard disk.',
                 f'{param} and {value} relate to core counts.',
                 f'Set {param} to {value}.',
                 f'{param} and {value} are unrelated.']
-        elif self.decision == DecisionType.PICK_FACTOR:
+        elif decision == DecisionType.PICK_FACTOR:
             v_factors = ['much lower than', 'slightly below', 
                          'to', 'slightly above', 'much higher than']
             choices = [f'Set {param} {f} {value}.' for f in v_factors]
@@ -68,10 +100,10 @@ class TuningBertFine(DocTuning):
             passage_cps = self._mask(passage_cps, param)
             choices = self._mask(choices, param)
         encoding = self.tokenizer(
-            passage_cps, choices, return_tensors='pt', 
+            passage_cps, choices, return_tensors='np', 
             padding='max_length', truncation=True, 
             max_length=self.max_length)
-        result = torch.stack(
+        result = np.stack(
             (encoding['input_ids'], encoding['token_type_ids'], 
-             encoding['attention_mask']), dim=0)
-        return result
\ No newline at end of file
+             encoding['attention_mask']), axis=0)
+        return torch.from_numpy(result.astype(self.obs_dtype))
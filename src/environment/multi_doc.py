@@ -11,11 +11,13 @@ from search.search_with_hints import ParameterExplorer
 from doc.collection import DocCollection
 from dbms.generic_dbms import ConfigurableDBMS
 import enum
+import environment.obs_store
 import gym.spaces
 import json
+import models.backend
+import models.registry
 import numpy as np
 import parameters.util
-import transformers
 
 class HintOrder(enum.IntEnum):
     """ The order in which tuning hints are considered. """
@@ -43,7 +45,7 @@ class MultiDocTuning(TuningBertFine):
             self, docs: DocCollection, max_length, mask_params, hint_order,
             dbms: ConfigurableDBMS, benchmark: Benchmark, hardware, 
             hints_per_episode, nr_evals, scale_perf, scale_asg, objective,
-            rec_path, use_recs):
+            rec_path, use_recs, obs_dtype=np.int64):
         """ Initialize from given tuning documents, database, and benchmark. 
         
         Args:
@@ -61,8 +63,10 @@ class MultiDocTuning(TuningBertFine):
             objective: describes the optimization goal
             rec_path: path to file with parameter recommendations
             use_recs: flag indicating whether to use recommendations
+            obs_dtype: integer type of observations (e.g., np.int16)
         """
-        super().__init__(docs, hints_per_episode, max_length, mask_params)
+        super().__init__(
+            docs, hints_per_episode, max_length, mask_params, obs_dtype)
         self.dbms = dbms
         self.benchmark = benchmark
         self.hardware = hardware
@@ -79,7 +83,7 @@ class MultiDocTuning(TuningBertFine):
         print('All hints considered for multi-doc tuning:')
         for i in range(self.nr_hints):
             _, hint = self.hints[i]
-            print(f'Hint nr. {i}: {hint.param.group()} -> {hint.value.group()}')
+            print(f'Hint nr. {i}: {hint.param_name} -> {hint.value.group()}')
         self.explorer = ParameterExplorer(dbms, benchmark, objective)
         self.use_recs = use_recs
         if use_recs:
@@ -142,7 +146,7 @@ class MultiDocTuning(TuningBertFine):
     
     def _process_hint(self, hint, action):
         """ Finishes processing current hint and returns direct reward. """
-        param = hint.param.group()
+        param = hint.param_name
         value = str(int(self.base * self.factor)) + hint.val_unit
         success = self.dbms.can_set(param, value)
         assignment = (param, value)
@@ -216,12 +220,13 @@ class MultiDocTuning(TuningBertFine):
 
 class MultiDocBart(MultiDocTuning):
     """ Database tuning using multiple documents and the BART model. """
+    bart_model = 'facebook/bart-large-mnli'
     
     def __init__(
         self, docs: DocCollection, max_length, mask_params, hint_order,
         dbms: ConfigurableDBMS, benchmark: Benchmark, hardware, 
         hints_per_episode, nr_evals, scale_perf, scale_asg, objective,
-        rec_path, use_recs):
+        rec_path, use_recs, obs_dir=None):
         """ Initialize from given tuning documents, database, and benchmark. 
         
         Args:
@@ -239,11 +244,9 @@ class MultiDocBart(MultiDocTuning):
             objective: describes the optimization goal
             rec_path: path to file with parameter recommendations
             use_recs: flag indicating whether to use recommendations
+            obs_dir: directory storing observations across runs (optional)
         """
         self.warmup = True
-        self.bart = transformers.pipeline(
-            'zero-shot-classification',
-            model='facebook/bart-large-mnli')
         self.obs_cache = {}
         super().__init__(
             docs, max_length, mask_params, hint_order, dbms, 
@@ -251,6 +254,23 @@ class MultiDocBart(MultiDocTuning):
             scale_perf, scale_asg, objective, rec_path, use_recs)
         self.observation_space = gym.spaces.Box(
             0, 1, (8,), np.float32)
+        self.obs_store = None
+        if obs_dir:
+            settings = {
+                'environment': type(self).__name__,
+                'hints': environment.obs_store.hint_fingerprint(
+                    self.hints, docs.nr_docs),
+                'hint_order': int(hint_order),
+                'model': self.bart_model,
+                'backend': models.backend.default_backend}
+            self.obs_store = environment.obs_store.ObservationStore(
+                obs_dir, settings, len(DecisionType), 8)
+    
+    @property
+    def bart(self):
+        """ Zero-shot classification pipeline (shared, loaded on first use). """
+        return models.registry.get_pipeline(
+            'zero-shot-classification', self.bart_model)
     
     def step(self, action):
         """ Performs one step in the environment. 
@@ -301,8 +321,13 @@ class MultiDocBart(MultiDocTuning):
         obs_idx = (self.hint_ctr, int(self.decision))
         if obs_idx in self.obs_cache:
             return self.obs_cache[obs_idx]
+        stored = None
+        if self.obs_store and not self.warmup:
+            stored = self.obs_store.get(*obs_idx)
         if self.warmup:
             observations =  self.observation_space.sample()
+        elif stored is not None:
+            observations = stored.tolist()
         else:
             print(f'No warmup - hint counter: {self.hint_ctr}')
             _, hint = self.hints[self.hint_ctr]
@@ -335,6 +360,9 @@ class MultiDocBart(MultiDocTuning):
             scaled_decision = float(self.decision) / 3
             scaled_vals = [scaled_doc_id, scaled_hint_ctr, scaled_decision]
             observations = scaled_vals + scores
+            if self.obs_store:
+                self.obs_store.put(*obs_idx, observations)
+                self.obs_store.flush()
         self.obs_cache[obs_idx] = observations
         return observations
     
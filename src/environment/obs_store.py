@@ -0,0 +1,160 @@
+'''
+Persistent store of observations, shared between tuning runs.
+'''
+import fcntl
+import hashlib
+import json
+import numpy as np
+import os
+
+def hint_fingerprint(hints, nr_docs):
+    """ Computes hash identifying a sequence of hints.
+
+    Args:
+        hints: list of (document ID, hint) pairs
+        nr_docs: number of documents in collection
+
+    Returns:
+        hexadecimal hash over hints and their order
+    """
+    hasher = hashlib.sha256(str(nr_docs).encode())
+    for doc_id, hint in hints:
+        hasher.update(json.dumps([
+            doc_id, hint.param_name, hint.param.span(), hint.value.span(),
+            hint.recommendation, hint.passage, int(hint.hint_type)]).encode())
+    return hasher.hexdigest()
+
+class ObservationStore():
+    """ Stores observation vectors by hint index and decision type.
+
+    Observations are kept in a memory-mapped file, together with a
+    second file marking stored observations. Files are identified by
+    a hash over all settings affecting observations. Several processes
+    may use the same store concurrently, as observations stored under
+    the same key are identical.
+    """
+
+    def __init__(self, store_dir, settings, nr_decisions, obs_size):
+        """ Opens store for given settings, creating files if necessary.
+
+        Args:
+            store_dir: directory containing observation stores
+            settings: dictionary with all inputs determining observations
+            nr_decisions: number of decision types per hint
+            obs_size: number of floats per observation
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        key = hashlib.sha256(
+            json.dumps(settings, sort_keys=True).encode()).hexdigest()
+        self.obs_path = os.path.join(store_dir, f'{key}.obs')
+        self.filled_path = os.path.join(store_dir, f'{key}.filled')
+        self.lock_path = os.path.join(store_dir, f'{key}.lock')
+        self.nr_decisions = nr_decisions
+        self.obs_size = obs_size
+        self.capacity = 0
+        self.obs = None
+        self.filled = None
+        for path in [self.obs_path, self.filled_path]:
+            open(path, 'ab').close()
+        self._map()
+        print(f'Using observation store {self.obs_path} ' \
+              f'({self.nr_filled()} observations)')
+
+    def get(self, row, decision):
+        """ Returns stored observation or None if not available.
+
+        Args:
+            row: index of hint
+            decision: decision type
+
+        Returns:
+            observation vector or None
+        """
+        if row >= self.capacity:
+            self._map()
+        if row < self.capacity and self.filled[row, decision]:
+            return np.array(self.obs[row, decision])
+        return None
+
+    def get_rows(self, start, end):
+        """ Returns observations for a range of hints if all are stored.
+
+        Args:
+            start: index of first hint
+            end: index after last hint
+
+        Returns:
+            array of shape [end-start, decisions, size] or None
+        """
+        if end > self.capacity:
+            self._map()
+        if end <= self.capacity and self.filled[start:end].all():
+            return np.array(self.obs[start:end])
+        return None
+
+    def put(self, row, decision, obs):
+        """ Stores observation for given hint and decision type.
+
+        Args:
+            row: index of hint
+            decision: decision type
+            obs: observation vector
+        """
+        self._ensure_capacity(row + 1)
+        self.obs[row, decision] = obs
+        self.filled[row, decision] = 1
+
+    def put_rows(self, start, obs):
+        """ Stores observations for a range of hints.
+
+        Args:
+            start: index of first hint
+            obs: array of shape [nr_hints, decisions, size]
+        """
+        end = start + len(obs)
+        self._ensure_capacity(end)
+        self.obs[start:end] = obs
+        self.filled[start:end] = 1
+
+    def nr_filled(self):
+        """ Returns number of stored observations. """
+        return 0 if self.filled is None else int(self.filled.sum())
+
+    def flush(self):
+        """ Writes changes to disk. """
+        for array in [self.obs, self.filled]:
+            if array is not None:
+                array.flush()
+
+    def _ensure_capacity(self, nr_rows):
+        """ Grows files to store at least given number of rows. """
+        if nr_rows <= self.capacity:
+            return
+        with open(self.lock_path, 'a') as lock:
+            # Other processes may grow the files concurrently
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._map()
+            if nr_rows > self.capacity:
+                self.flush()
+                new_capacity = max(nr_rows, 2 * self.capacity, 64)
+                for path, row_bytes in [
+                        (self.obs_path, 4 * self.nr_decisions * self.obs_size),
+                        (self.filled_path, self.nr_decisions)]:
+                    with open(path, 'r+b') as file:
+                        file.truncate(new_capacity * row_bytes)
+                self._map()
+
+    def _map(self):
+        """ Maps files into memory, using their current size. """
+        obs_row_bytes = 4 * self.nr_decisions * self.obs_size
+        capacity = min(
+            os.path.getsize(self.obs_path) // obs_row_bytes,
+            os.path.getsize(self.filled_path) // self.nr_decisions)
+        if capacity > self.capacity:
+            self.obs = np.memmap(
+                self.obs_path, dtype=np.float32, mode='r+',
+                shape=(capacity, self.nr_decisions, self.obs_size))
+            self.filled = np.memmap(
+                self.filled_path, dtype=np.uint8, mode='r+',
+                shape=(capacity, self.nr_decisions))
+            self.capacity = capacity
@@ -146,17 +146,13 @@ class OneDocTuning(gym.Env):
         
     def _hint_to_obs(self, hint: TuningHint):
         """ Maps tuning hint to an observation vector. """
-        tokens = nlp.tokenize(hint.passage)
-        encoding = nlp.encode(hint.passage)
+        offsets, states = nlp.encode_batch([hint.passage])[0]
         # Map parameter and value to vector
-        obs_parts = []
-        for item in [hint.param, hint.value]:
-            obs_parts.append(
-                nlp.mean_encoding(
-                    tokens, encoding, item.start(), item.end()))
+        spans = torch.tensor([hint.param.span(), hint.value.span()])
+        obs_parts, found = nlp.pool_spans(offsets, states, spans)
         # Use zeros in case of missing vectors
         obs = self.def_obs
-        if not (obs_parts[0] is None or obs_parts[1] is None):
+        if found.all():
             obs = torch.cat((obs_parts[0], obs_parts[1]))
         return obs
         
@@ -0,0 +1,30 @@
+'''
+Tests for the persistent store of observations.
+'''
+from environment.obs_store import ObservationStore
+import numpy as np
+import tempfile
+import unittest
+
+class TestObservationStore(unittest.TestCase):
+    """ Test persistent storage of observations. """
+    
+    def test_store(self):
+        """ Test storing and reloading observations. """
+        with tempfile.TemporaryDirectory() as store_dir:
+            settings = {'hints':'abc', 'order':0}
+            store = ObservationStore(store_dir, settings, 2, 8)
+            self.assertIsNone(store.get(0, 0))
+            obs = np.arange(48, dtype=np.float32).reshape(3, 2, 8)
+            store.put_rows(0, obs)
+            store.put(100, 1, np.ones(8))
+            self.assertIsNone(store.get(100, 0))
+            store.flush()
+            
+            reopened = ObservationStore(store_dir, settings, 2, 8)
+            self.assertTrue((reopened.get_rows(0, 3) == obs).all())
+            self.assertIsNone(reopened.get_rows(0, 4))
+            self.assertTrue((reopened.get(100, 1) == 1).all())
+            self.assertEqual(reopened.nr_filled(), 7)
+            other = ObservationStore(store_dir, {'hints':'abd'}, 2, 8)
+            self.assertEqual(other.nr_filled(), 0)
@@ -5,16 +5,21 @@ Created on Nov 15, 2021
 '''
 import benchmark
 import collections
+import concurrent.futures
 import dataclasses
 import dbms
-import doc
+import doc.hint_table
 import enum
+import environment.obs_store
 import gym.spaces
-import models.util
+import itertools
+import models.backend
+import models.registry
+import nlp.zero_shot
 import numpy as np
 import pandas as pd
 import search.feature_wise_search
-import transformers
+import time
 import typing
 
 class DecisionType(enum.IntEnum):
@@ -68,14 +73,20 @@ class NlpTuningEnv(gym.Env):
         as sequential decisions. Observations provided to the
         agent are derived from zero-shot classification results.
     """
-    bart = transformers.pipeline(
-        'zero-shot-classification', 
-        model='facebook/bart-large-mnli',
-        device=models.util.torch_device())
+    bart_model = 'facebook/bart-large-mnli'
+    factor_choices = [
+        'Decrease recommendation strongly', 'Decrease recommendation', 
+        'Use recommendation', 'Increase recommendation', 
+        'Increase recommendation strongly']
+    weight_choices = [
+        f'This hint is {w} important.' for w in 
+        ['not', 'somewhat', 'quite', 'very', 'super']]
     
     def __init__(
             self, docs, max_length, hint_order, dbms, benchmark, hardware, 
-            hints_per_episode, nr_evals, scale_perf, scale_asg, objective):
+            hints_per_episode, nr_evals, scale_perf, scale_asg, objective,
+            batch_size=8, obs_dir=None, pipeline=False, eval_cache=None,
+            scheduler=None):
         """ Initialize from given tuning documents, database, and benchmark. 
         
         Args:
@@ -90,34 +101,76 @@ class NlpTuningEnv(gym.Env):
             scale_perf: scale performance reward by this factor
             scale_asg: scale reward for successful assignments
             objective: describes the optimization goal
+            batch_size: number of inputs per zero-shot classifier invocation
+            obs_dir: directory storing observations across runs (optional)
+            pipeline: prepare next episode while benchmarks run if set
+            eval_cache: reuse benchmark results from this cache (optional)
+            scheduler: evaluate configurations on DBMS replicas (optional)
         """
         self.docs = docs
         self.max_length = max_length
-        self.hints = self._ordered_hints(hint_order)
+        self.hint_order = hint_order
+        self.hints_per_episode = hints_per_episode
         self.dbms = dbms
         self.benchmark = benchmark
         self.hardware = hardware
-        self.hints_per_episode = hints_per_episode
         self.nr_evals = nr_evals
         self.scale_perf = scale_perf
         self.scale_asg = scale_asg
         self.explorer = search.feature_wise_search.FeatureWiseExplorer(
-            dbms, benchmark, objective)
+            dbms, benchmark, objective, eval_cache, scheduler)
         self.decision = DecisionType.PICK_FACTOR
         self.factors = [0.25, 0.5, 1, 2, 4]
         self.weights = [1, 2, 4, 8, 16]
         self.action_space = gym.spaces.Discrete(5)
-        self.obs_cache = {}
+        self.batch_size = batch_size
+        # Observations for each hint and decision type
+        self.obs_table = np.zeros((0, 2, 8), np.float32)
         self.observation_space = gym.spaces.Box(0, 1, (8,), np.float32)
         self.hint_ctr = 0
         self.episode_hint_ctr = 0
-        self.nr_hints = len(self.hints)
         self.hint_to_weight = collections.defaultdict(lambda: 0)
         self.log = []
         self.log_dict = {}
-        print('All hints considered for multi-doc tuning:')
-        for i, (_, hint) in enumerate(self.hints):
-            print(f'Hint {i}: {hint.param.group()} -> {hint.value.group()}')
+        self.obs_dir = obs_dir
+        self.obs_store = None
+        self.pipeline = pipeline
+        self.prefetch = None
+        if pipeline:
+            self.executor = concurrent.futures.ThreadPoolExecutor(1)
+            if not docs.lazy:
+                print('Warning: pipelining has no effect unless hints ' \
+                      'are extracted lazily (all hints are known upfront).')
+        if docs.lazy:
+            # Start tuning while hints are extracted from later documents
+            self.hint_source = docs.hint_stream()
+            self.pending_hints = collections.defaultdict(collections.deque)
+            self.hints = []
+            self.nr_hints = 0
+            # Hints are only known in advance if extraction is cached
+            if obs_dir and docs.cache:
+                self._open_obs_store({
+                    'docs': docs.cache_key, 
+                    'hints_per_episode': hints_per_episode})
+            self._extend_hints()
+        else:
+            self.hint_source = None
+            self.hints = self._ordered_hints(hint_order)
+            self.nr_hints = len(self.hints)
+            print('All hints considered for multi-doc tuning:')
+            for i, (_, hint) in enumerate(self.hints):
+                print(f'Hint {i}: {hint.param_name} -> {hint.value.group()}')
+            if obs_dir:
+                fingerprint = environment.obs_store.hint_fingerprint(
+                    self.hints, docs.nr_docs)
+                self._open_obs_store({'hints': fingerprint})
+            self._precompute_obs()
+    
+    @property
+    def bart(self):
+        """ Zero-shot classification pipeline (shared, loaded on first use). """
+        return models.registry.get_pipeline(
+            'zero-shot-classification', self.bart_model)
     
     def reset(self):
         """ Initializes for new tuning episode. 
@@ -166,6 +219,8 @@ class NlpTuningEnv(gym.Env):
         """
         print('Finalizing episode!')
         if self.hint_to_weight:
+            if self.pipeline and self.docs.lazy:
+                self.prefetch = self.executor.submit(self._prefetch)
             reward, config = self.explorer.explore(
                 self.hint_to_weight, self.nr_evals)
             print(f'Achieved unscaled reward of {reward} using {config}.')
@@ -174,6 +229,67 @@ class NlpTuningEnv(gym.Env):
         else:
             return 0.0
 
+    def _prefetch(self):
+        """ Prepares hints of next episode, executed during benchmarks.
+        
+        Extracts hints and calculates their observations if necessary.
+        Does not access the DBMS, which is busy running benchmarks.
+        Worker processes extracting hints (if any) were forked from the
+        main thread when the hint stream was created.
+        """
+        end = self.hint_ctr + self.hints_per_episode
+        while self.nr_hints < end and self._extend_hints():
+            pass
+    
+    def _extend_hints(self):
+        """ Appends hints from further documents when extracting lazily.
+        
+        New hints are appended to the current order, so indexes of
+        previously considered hints (and their observations) remain
+        valid. Orders by parameter are approximated using statistics
+        over the documents processed so far.
+        
+        Returns:
+            True iff new hints were added
+        """
+        if self.hint_source is None:
+            return False
+        nr_old_hints = len(self.hints)
+        while len(self.hints) == nr_old_hints:
+            new_hints = list(itertools.islice(
+                self.hint_source, self.hints_per_episode))
+            if self.hint_order == HintOrder.DOCUMENT:
+                self.hints += new_hints
+                if not new_hints:
+                    break
+            else:
+                for doc_id, hint in new_hints:
+                    param = hint.param_name
+                    self.pending_hints[param].append((doc_id, hint))
+                if not any(self.pending_hints.values()):
+                    break
+                self._schedule_round()
+        
+        self.nr_hints = len(self.hints)
+        for i in range(nr_old_hints, self.nr_hints):
+            _, hint = self.hints[i]
+            print(f'Hint {i}: {hint.param_name} -> {hint.value.group()}')
+        self._precompute_obs()
+        return self.nr_hints > nr_old_hints
+    
+    def _schedule_round(self):
+        """ Appends one round of pending hints, ordered by parameter.
+        
+        Applying rounds until no hints are pending yields the same
+        order as _hints_by_stride or _hints_by_param over all hints.
+        """
+        step = 10 if self.hint_order == HintOrder.BY_STRIDE else None
+        for param, _ in self.docs.param_counts.most_common():
+            param_hints = self.pending_hints[param]
+            nr_scheduled = len(param_hints) if step is None else step
+            for _ in range(min(nr_scheduled, len(param_hints))):
+                self.hints.append(param_hints.popleft())
+    
     def _hints_by_doc(self):
         """ Returns hints in document collection order. 
         
@@ -231,6 +347,8 @@ class NlpTuningEnv(gym.Env):
             # Update hint counter
             self.hint_ctr += 1
             print(f'Hint counter: {self.hint_ctr}')
+            if self.hint_ctr >= self.nr_hints:
+                self._extend_hints()
             if self.hint_ctr >= self.nr_hints:
                 self.hint_ctr = 0
             # Update episode hint counter
@@ -244,49 +362,112 @@ class NlpTuningEnv(gym.Env):
                 return True
         return False
         
+    def _open_obs_store(self, hint_settings):
+        """ Opens persistent store for observations.
+        
+        Args:
+            hint_settings: dictionary identifying the hint sequence
+        """
+        settings = {
+            'environment': type(self).__name__,
+            'hint_order': int(self.hint_order),
+            'model': self.bart_model,
+            'backend': models.backend.default_backend,
+            'choices': [self.factor_choices, self.weight_choices],
+            **hint_settings}
+        self.obs_store = environment.obs_store.ObservationStore(
+            self.obs_dir, settings, 2, 8)
+    
+    def _precompute_obs(self):
+        """ Calculates observations for all hints without observations.
+        
+        Observations are read from the observation store if available.
+        Otherwise, recommendations are classified by the zero-shot
+        classifier in batches, for both decision types at once.
+        """
+        start = len(self.obs_table)
+        end = len(self.hints)
+        if start == end:
+            return
+        
+        obs = None
+        if self.obs_store:
+            obs = self.obs_store.get_rows(start, end)
+        if obs is None:
+            obs = self._classify_hints(start, end)
+            if self.obs_store:
+                self.obs_store.put_rows(start, obs)
+                self.obs_store.flush()
+        else:
+            print(f'Read observations for hints {start} to {end-1} from store')
+        self.obs_table = np.concatenate((self.obs_table, obs))
+    
+    def _classify_hints(self, start, end):
+        """ Calculates observations for a range of hints.
+        
+        Args:
+            start: index of first hint
+            end: index after last hint
+        
+        Returns:
+            float array of shape [end-start, 2, 8] with observations
+        """
+        new_hints = [hint for _, hint in self.hints[start:end]]
+        start_s = time.time()
+        recommendations = list(dict.fromkeys(
+            hint.recommendation for hint in new_hints))
+        rec_to_idx = {rec:idx for idx, rec in enumerate(recommendations)}
+        scores = []
+        for choices in [self.factor_choices, self.weight_choices]:
+            scores.append(nlp.zero_shot.classify(
+                self.bart, recommendations, choices, 
+                self.batch_size * len(choices)).numpy())
+        
+        obs = np.zeros((len(new_hints), 2, 8), np.float32)
+        rec_idxs = [rec_to_idx[hint.recommendation] for hint in new_hints]
+        obs[:, :, 0] = np.array(
+            [hint.doc_id for hint in new_hints])[:, None] / self.docs.nr_docs
+        obs[:, :, 1] = np.arange(
+            start, start + len(new_hints))[:, None] / self.nr_hints
+        for decision in [DecisionType.PICK_FACTOR, DecisionType.PICK_WEIGHT]:
+            obs[:, decision, 2] = float(decision) / 3
+            obs[:, decision, 3:] = scores[decision][rec_idxs]
+        
+        elapsed_s = time.time() - start_s
+        nr_pairs = 2 * len(new_hints)
+        print(f'Precomputed observations for {nr_pairs} (hint, decision) ' \
+              f'pairs ({len(recommendations)} distinct recommendations) ' \
+              f'in {elapsed_s:.2f} s ({nr_pairs/elapsed_s:.2f} pairs/s)')
+        return obs
+    
     def _observe(self):
         """ Generate observation for current decision and hint.
         
         Returns:
             Vector of floats: document, hint, decision, and BART scores.
         """
-        obs_idx = (self.hint_ctr, int(self.decision))
-        if obs_idx in self.obs_cache:
-            l_obs = self.obs_cache[obs_idx]
+        self._join_prefetch()
+        _, hint = self.hints[self.hint_ctr]
+        if self.decision == DecisionType.PICK_FACTOR:
+            decision_txt = f'Deciding adaption of {hint}'
+            choices = self.factor_choices
         else:
-            print(f'No warmup - hint counter: {self.hint_ctr}')
-            _, hint = self.hints[self.hint_ctr]
-            if self.decision == DecisionType.PICK_FACTOR:
-                decision_txt = f'Deciding adaption of {hint}'
-                choices = ['Decrease recommendation strongly', 
-                           'Decrease recommendation', 
-                           'Use recommendation', 
-                           'Increase recommendation', 
-                           'Increase recommendation strongly']
-            else:
-                decision_txt = f'Deciding weight of {hint}'
-                v_weights = ['not', 'somewhat', 'quite', 'very', 'super']
-                choices = [f'This hint is {w} important.' for w in v_weights]
-            
-            result = self.bart(hint.recommendation, choices)
-            print(result)
-            scores = []
-            for choice in choices:
-                choice_idx = result['labels'].index(choice)
-                score = result['scores'][choice_idx]
-                scores += [score]
-            
-            scaled_doc_id = hint.doc_id / self.docs.nr_docs
-            scaled_hint_ctr = self.hint_ctr / self.nr_hints
-            scaled_decision = float(self.decision) / 3
-            scaled_vals = [scaled_doc_id, scaled_hint_ctr, scaled_decision]
-            obs = scaled_vals + scores
-            l_obs = LabeledObservation(obs, decision_txt, choices, scores)
-        
+            decision_txt = f'Deciding weight of {hint}'
+            choices = self.weight_choices
+        obs = self.obs_table[self.hint_ctr, int(self.decision)]
+        l_obs = LabeledObservation(obs, decision_txt, choices, obs[3:].tolist())
         l_obs.output()
-        self.obs_cache[obs_idx] = l_obs
         return l_obs.obs
     
+    def _join_prefetch(self):
+        """ Waits until preparation of the current episode finishes. """
+        if self.prefetch:
+            start_s = time.time()
+            self.prefetch.result()
+            self.prefetch = None
+            wait_s = time.time() - start_s
+            print(f'Waited {wait_s:.2f} s for episode preparation')
+    
     def _ordered_hints(self, hint_order):
         """ Returns hints according to specified order.
         
@@ -313,11 +494,8 @@ class NlpTuningEnv(gym.Env):
         Returns:
             reward for DBMS accepting parameter value assignment
         """
-        param = hint.param.group()
-        if (self.base * self.factor).is_integer():                
-            value = str(int(self.base * self.factor)) + hint.val_unit
-        else:
-            value = str(self.base * self.factor) + hint.val_unit
+        param = hint.param_name
+        value = self._hint_value(hint, self.base, self.factor)
         success = self.dbms.can_set(param, value)
         assignment = (param, value)
         print(f'Trying assigning {param} to {value}')
@@ -340,6 +518,43 @@ class NlpTuningEnv(gym.Env):
             'Accepted':success, 'A-Reward':reward, 'P-Reward':0.0}
         return reward
 
+    def _hint_base(self, hint):
+        """ Calculates value recommended by hint for current hardware.
+        
+        Args:
+            hint: tuning hint
+        
+        Returns:
+            recommended value (before scaling by factor)
+        """
+        hint_type = hint.hint_type
+        if hint_type == doc.hint_table.HintType.DISK_RATIO:
+            return float(self.hardware['disk']) * hint.float_val
+        elif hint_type == doc.hint_table.HintType.RAM_RATIO:
+            return float(self.hardware['memory']) * hint.float_val
+        elif hint_type == doc.hint_table.HintType.CORES_RATIO:
+            return float(self.hardware['cores']) * hint.float_val
+        elif hint_type == doc.hint_table.HintType.ABSOLUTE:
+            return hint.float_val
+        else:
+            raise ValueError(f'Unknown hint type: {hint_type}')
+    
+    def _hint_value(self, hint, base, factor):
+        """ Formats value to assign for given base value and factor.
+        
+        Args:
+            hint: tuning hint
+            base: value recommended by hint
+            factor: multiply recommended value by this factor
+        
+        Returns:
+            value as string, including unit of hint
+        """
+        if (base * factor).is_integer():
+            return str(int(base * factor)) + hint.val_unit
+        else:
+            return str(base * factor) + hint.val_unit
+    
     def _take_action(self, action):
         """ Process action and return obtained reward.
         
@@ -353,18 +568,8 @@ class NlpTuningEnv(gym.Env):
         _, hint = self.hints[self.hint_ctr]
         # Distinguish by decision type
         if self.decision == DecisionType.PICK_FACTOR:
-            hint_type = hint.hint_type
-            self.type_text = str(hint_type)
-            if hint_type == doc.collection.HintType.DISK_RATIO:
-                self.base = float(self.hardware['disk']) * hint.float_val
-            elif hint_type == doc.collection.HintType.RAM_RATIO:
-                self.base = float(self.hardware['memory']) * hint.float_val
-            elif hint_type == doc.collection.HintType.CORES_RATIO:
-                self.base = float(self.hardware['cores']) * hint.float_val
-            elif hint_type == doc.collection.HintType.ABSOLUTE:
-                self.base = hint.float_val
-            else:
-                raise ValueError(f'Unknown hint type: {hint_type}')
+            self.type_text = str(hint.hint_type)
+            self.base = self._hint_base(hint)
             self.factor = float(self.factors[action])
         else:
             reward = self._process_hint(hint, action)
@@ -0,0 +1,121 @@
+'''
+Selects the inference backend for language models.
+'''
+import models.util
+
+# Supported inference backends
+backends = ['fp32', 'int8', 'onnx']
+# Backend used unless specified otherwise (set before loading models)
+default_backend = 'fp32'
+# ONNX export via optimum (>=1.6) requires this transformers version
+onnx_min_transformers = '4.26.0'
+
+# Maps tasks to auto classes for PyTorch and ONNX Runtime models
+_task_classes = {
+    'question-answering': (
+        'AutoModelForQuestionAnswering', 'ORTModelForQuestionAnswering'),
+    'zero-shot-classification': (
+        'AutoModelForSequenceClassification',
+        'ORTModelForSequenceClassification'),
+    'feature-extraction': ('AutoModel', 'ORTModelForFeatureExtraction')}
+
+def set_backend(backend):
+    """ Sets backend for all models loaded afterwards.
+
+    Args:
+        backend: name of inference backend (fp32, int8, or onnx)
+    """
+    global default_backend
+    _check_backend(backend)
+    if backend == 'onnx':
+        _check_onnx()
+    default_backend = backend
+
+def load_model(model_name, task='feature-extraction', backend=None):
+    """ Loads model using given backend.
+
+    Args:
+        model_name: name of pre-trained model
+        task: task determining the model head
+        backend: inference backend (default backend if not specified)
+
+    Returns:
+        model in evaluation mode
+    """
+    backend = backend or default_backend
+    _check_backend(backend)
+    torch_class, ort_class = _task_classes[task]
+    if backend == 'onnx':
+        _check_onnx()
+        import optimum.onnxruntime
+        ort_class = getattr(optimum.onnxruntime, ort_class)
+        return ort_class.from_pretrained(model_name, export=True)
+
+    import transformers
+    model = getattr(transformers, torch_class).from_pretrained(model_name)
+    model.eval()
+    if backend == 'int8':
+        model = quantize(model)
+    return model
+
+def load_pipeline(task, model_name, backend=None, **kwargs):
+    """ Creates pipeline whose model uses given backend.
+
+    Args:
+        task: pipeline task (e.g., question-answering)
+        model_name: name of pre-trained model
+        backend: inference backend (default backend if not specified)
+        kwargs: additional arguments for pipeline
+
+    Returns:
+        pipeline for given task
+    """
+    import transformers
+    backend = backend or default_backend
+    model = load_model(model_name, task, backend)
+    device = models.util.torch_device() if backend == 'fp32' else -1
+    return transformers.pipeline(
+        task, model=model, tokenizer=model_name, device=device, **kwargs)
+
+def quantize(model):
+    """ Quantizes weights of linear layers to int8 for CPU inference.
+
+    Activations are quantized dynamically during inference.
+
+    Args:
+        model: PyTorch model to quantize
+
+    Returns:
+        quantized model
+    """
+    import torch
+    return torch.quantization.quantize_dynamic(
+        model.to('cpu'), {torch.nn.Linear}, dtype=torch.qint8)
+
+def _check_onnx():
+    """ Raises an exception unless the ONNX backend is supported.
+
+    The ONNX backend is optional: it requires optimum[onnxruntime]>=1.6,
+    which is incompatible with the transformers version pinned in the
+    requirements (upgrade both to use it).
+    """
+    from packaging import version
+    import transformers
+    if version.parse(transformers.__version__) < \
+        version.parse(onnx_min_transformers):
+        raise ValueError(
+            f'ONNX backend requires transformers>={onnx_min_transformers} ' \
+            f'(installed: {transformers.__version__}) and ' \
+            f'optimum[onnxruntime]>=1.6, use fp32 or int8 instead')
+    try:
+        import optimum.onnxruntime
+    except ImportError:
+        raise ValueError(
+            'ONNX backend requires optimum: ' \
+            'pip install "optimum[onnxruntime]>=1.6"')
+
+def _check_backend(backend):
+    """ Raises an exception for unknown backends. """
+    if backend not in backends:
+        raise ValueError(
+            f'Unknown inference backend: {backend} (use one of {backends})')
@@ -0,0 +1,72 @@
+'''
+Callbacks controlling reinforcement learning runs.
+'''
+from stable_baselines3.common.callbacks import BaseCallback
+import time
+
+class TimeBudgetCallback(BaseCallback):
+    """ Stops training after timeout and reports time per step.
+
+    Time is split into environment steps (including policy inference)
+    and framework overheads (model updates and bookkeeping between
+    rollouts). This allows to run a single call to `learn` instead of
+    one call per frame.
+    """
+
+    def __init__(self, timeout_s, report_every=100, verbose=0):
+        """ Initializes time budget.
+
+        Args:
+            timeout_s: stop training after so many seconds
+            report_every: print timing statistics after so many steps
+            verbose: verbosity level of callback
+        """
+        super().__init__(verbose)
+        self.timeout_s = timeout_s
+        self.report_every = report_every
+        self.start_s = None
+        self.last_s = None
+        self.step_s = 0
+        self.nr_steps = 0
+
+    def _on_training_start(self):
+        """ Starts measuring time. """
+        self.start_s = time.time()
+        self.last_s = self.start_s
+
+    def _on_rollout_start(self):
+        """ Excludes model updates from time of next step. """
+        self.last_s = time.time()
+
+    def _on_step(self):
+        """ Accounts for one step, returns False once timeout is reached.
+
+        Returns:
+            flag indicating whether to continue training
+        """
+        now_s = time.time()
+        self.step_s += now_s - self.last_s
+        self.last_s = now_s
+        self.nr_steps += 1
+        if self.nr_steps % self.report_every == 0:
+            self.print_stats()
+        elapsed_s = now_s - self.start_s
+        if elapsed_s > self.timeout_s:
+            print(f'Timeout after {elapsed_s:.1f} seconds.')
+            return False
+        return True
+
+    def _on_training_end(self):
+        """ Prints final timing statistics. """
+        self.print_stats()
+
+    def print_stats(self):
+        """ Prints time spent in steps and framework overheads. """
+        elapsed_s = time.time() - self.start_s
+        overhead_s = elapsed_s - self.step_s
+        per_step_s = self.step_s / max(self.nr_steps, 1)
+        overhead_per_step_s = overhead_s / max(self.nr_steps, 1)
+        print(f'Steps: {self.nr_steps}; step time: {self.step_s:.2f} s ' \
+              f'({per_step_s:.3f} s/step); overhead: {overhead_s:.2f} s ' \
+              f'({overhead_per_step_s:.3f} s/step, ' \
+              f'{100 * overhead_s / max(elapsed_s, 1e-9):.1f}%)')
@@ -0,0 +1,113 @@
+'''
+Process-wide registry of language models, loaded on first use.
+'''
+import gc
+import models.backend
+import threading
+import torch
+
+# Maps keys (tuples starting with kind and model name) to loaded models
+_loaded = {}
+_lock = threading.RLock()
+
+def get(key, loader):
+    """ Returns model registered under key, loading it if necessary.
+
+    Args:
+        key: tuple identifying the model (kind and model name first)
+        loader: function without arguments that loads the model
+
+    Returns:
+        the registered model
+    """
+    with _lock:
+        if key not in _loaded:
+            print(f'Loading {key[0]} {key[1]} ...')
+            _loaded[key] = loader()
+        return _loaded[key]
+
+def get_pipeline(task, model_name):
+    """ Returns pipeline for given task and model (using default backend).
+
+    Args:
+        task: pipeline task (e.g., zero-shot-classification)
+        model_name: name of pre-trained model
+
+    Returns:
+        pipeline shared by all components using the same task and model
+    """
+    backend = models.backend.default_backend
+    return get(
+        ('pipeline', model_name, task, backend),
+        lambda: models.backend.load_pipeline(task, model_name, backend))
+
+def get_model(model_name, task='feature-extraction'):
+    """ Returns model with head for given task (using default backend).
+
+    Args:
+        model_name: name of pre-trained model
+        task: task determining the model head
+
+    Returns:
+        model shared by all components using the same task and model
+    """
+    backend = models.backend.default_backend
+    return get(
+        ('model', model_name, task, backend),
+        lambda: models.backend.load_model(model_name, task, backend))
+
+def get_tokenizer(model_name):
+    """ Returns fast tokenizer associated with given model.
+
+    Args:
+        model_name: name of pre-trained model
+
+    Returns:
+        tokenizer shared by all components using the same model
+    """
+    from transformers import AutoTokenizer
+    return get(
+        ('tokenizer', model_name),
+        lambda: AutoTokenizer.from_pretrained(model_name, use_fast=True))
+
+def get_sentence_transformer(model_name):
+    """ Returns sentence transformer (quantized for the int8 backend).
+
+    Args:
+        model_name: name of pre-trained sentence transformer
+
+    Returns:
+        sentence transformer shared by all components
+    """
+    backend = models.backend.default_backend
+
+    def load():
+        from sentence_transformers import SentenceTransformer
+        transformer = SentenceTransformer(model_name)
+        if backend == 'int8':
+            transformer = models.backend.quantize(transformer)
+        return transformer
+
+    return get(('sentence-transformer', model_name, backend), load)
+
+def loaded():
+    """ Returns keys of all loaded models. """
+    with _lock:
+        return list(_loaded.keys())
+
+def unload(model_name=None):
+    """ Unloads models to free memory (they are reloaded on next use).
+
+    Components must not keep references to unloaded models.
+
+    Args:
+        model_name: unload models with this name (all models if None)
+    """
+    with _lock:
+        for key in list(_loaded.keys()):
+            if model_name is None or key[1] == model_name:
+                print(f'Unloading {key[0]} {key[1]} ...')
+                del _loaded[key]
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
@@ -3,61 +3,208 @@ Created on Mar 23, 2021
 
 @author: immanueltrummer
 '''
-from transformers.models.bert import BertTokenizerFast
-from transformers import BertModel
+import collections
+import models.registry
 import torch
 
-# Initialize model and associated tokenizer
-tokenizer = BertTokenizerFast.from_pretrained("bert-base-cased")
-model = BertModel.from_pretrained("bert-base-cased")
+# Model and associated tokenizer are loaded on first use
+model_name = "bert-base-cased"
+
+def __getattr__(name):
+    """ Provides model and tokenizer as (lazily loaded) module attributes. """
+    if name == 'tokenizer':
+        return models.registry.get_tokenizer(model_name)
+    elif name == 'model':
+        return models.registry.get_model(model_name)
+    raise AttributeError(f'module {__name__} has no attribute {name}')
+
+class EncodingCache():
+    """ Size-bounded cache of text encodings, evicting least recently used. """
+    
+    def __init__(self, max_size):
+        """ Initializes empty cache.
+        
+        Args:
+            max_size: maximal number of cached encodings
+        """
+        self.max_size = max_size
+        self.encodings = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        """ Returns number of cached encodings. """
+        return len(self.encodings)
+    
+    def get(self, text):
+        """ Returns cached encoding for text or None (updates statistics). """
+        encoding = self.encodings.get(text)
+        if encoding is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.encodings.move_to_end(text)
+        return encoding
+    
+    def put(self, text, encoding):
+        """ Caches encoding for text, evicting old encodings if necessary. """
+        self.encodings[text] = encoding
+        self.encodings.move_to_end(text)
+        while len(self.encodings) > self.max_size:
+            self.encodings.popitem(last=False)
+    
+    def clear(self):
+        """ Removes all encodings and resets statistics. """
+        self.encodings.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def stats(self):
+        """ Returns dictionary with cache statistics. """
+        nr_requests = self.hits + self.misses
+        return {
+            'hits': self.hits, 'misses': self.misses, 'size': len(self),
+            'hit_rate': self.hits / nr_requests if nr_requests else 0}
 
 # Initialize caching for natural language analysis
 use_cache = False
-cached_encodings = {}
-
-# Store cache statistics
-cache_hits = 0
-cache_misses = 0
+encoding_cache = EncodingCache(512)
 
 def print_cache_stats():
     """ Print statistics for encoding cache. """
-    print(f'Nr. cache hits: {cache_hits}')
-    print(f'Nr. cache misses: {cache_misses}')
+    stats = encoding_cache.stats()
+    print(f'Nr. cache hits: {stats["hits"]}')
+    print(f'Nr. cache misses: {stats["misses"]}')
+    print(f'Nr. cached encodings: {stats["size"]}')
 
 def tokenize(text):
     """ Tokenizes input text using default settings. """
+    tokenizer = models.registry.get_tokenizer(model_name)
     return tokenizer.encode_plus(
             text, return_offsets_mapping=True, 
             return_tensors="pt", truncation=True)
     
+def token_lengths(texts):
+    """ Returns number of tokens produced by tokenize for each text. """
+    if not texts:
+        return []
+    tokenizer = models.registry.get_tokenizer(model_name)
+    encodings = tokenizer(
+        texts, truncation=True, return_attention_mask=False, 
+        return_token_type_ids=False)
+    return [len(ids) for ids in encodings['input_ids']]
+    
+def encode_batch(texts, batch_size=32):
+    """ Encodes texts in batches, without tracking gradients.
+    
+    Texts of similar length are batched together and padded to
+    the longest text in their batch. If enabled, encodings are
+    taken from and added to the encoding cache.
+    
+    Args:
+        texts: list of texts to encode
+        batch_size: number of texts per model invocation
+    
+    Returns:
+        list with (offsets, states) pair for each text: offsets
+        of tokens in text (tensor of shape [nr_tokens, 2]) and
+        last hidden states (tensor of shape [nr_tokens, hidden])
+    """
+    encodings = {}
+    to_encode = []
+    for text in texts:
+        if text in encodings:
+            continue
+        encoding = encoding_cache.get(text) if use_cache else None
+        if encoding is None:
+            encodings[text] = None
+            to_encode.append(text)
+        else:
+            encodings[text] = encoding
+    
+    if to_encode:
+        tokenizer = models.registry.get_tokenizer(model_name)
+        model = models.registry.get_model(model_name)
+        to_encode.sort(key=len)
+        with torch.inference_mode():
+            for start in range(0, len(to_encode), batch_size):
+                batch = to_encode[start:start+batch_size]
+                tokens = tokenizer(
+                    batch, padding=True, truncation=True, 
+                    return_offsets_mapping=True, return_tensors='pt')
+                offsets = tokens.pop('offset_mapping')
+                lengths = tokens['attention_mask'].sum(dim=1).tolist()
+                states = model(**tokens.to(model.device)).last_hidden_state
+                states = states.cpu()
+                for i, (text, length) in enumerate(zip(batch, lengths)):
+                    # Copy to release padded batch tensors
+                    encoding = (
+                        offsets[i, :length].clone(), 
+                        states[i, :length].clone())
+                    encodings[text] = encoding
+                    if use_cache:
+                        encoding_cache.put(text, encoding)
+    return [encodings[text] for text in texts]
+
 def encode(text):
-    """ Generates bidirectional encoding using default settings. """
-    global cache_hits
-    global cache_misses
-    if use_cache and text in cached_encodings:
-        encoding = cached_encodings[text]
-        cache_hits += 1
-    else:
-        encoding = model(tokenize(text)['input_ids'])
-        cache_misses += 1
-        if use_cache:
-            cached_encodings[text] = encoding
-    return encoding
-
-def mean_encoding(tokens, encoding, start, end):
-    """ Returns mean encoding for given character span. """
-    # Collect relevant states
-    last_states = encoding['last_hidden_state'].squeeze(0).tolist()
-    offsets = tokens['offset_mapping'].squeeze(0).tolist()
-    m_states = []
-    for o, s in zip(offsets, last_states):
-        o_start = o[0]
-        o_end = o[1]
-        if max(start, o_start) <= min(end, o_end):
-            m_states.append(s)
+    """ Generates bidirectional encoding using default settings. 
+    
+    Returns:
+        pair of token offsets and last hidden states (see encode_batch)
+    """
+    return encode_batch([text])[0]
+
+def pool_spans(offsets, states, spans, attention_mask=None):
+    """ Averages hidden states of tokens overlapping character spans.
+    
+    A token overlaps a span if their character ranges intersect or
+    touch. Inputs are either for a single passage or for a batch of
+    passages (with additional leading batch dimension B).
+    
+    Args:
+        offsets: token offsets, shape [T, 2] or [B, T, 2]
+        states: hidden states, shape [T, H] or [B, T, H]
+        spans: character spans, shape [S, 2] or [B, S, 2]
+        attention_mask: marks non-padding tokens, shape [B, T] (optional)
+    
+    Returns:
+        mean states of shape [S, H] or [B, S, H] (zero without
+        overlapping tokens) and flags of shape [S] or [B, S]
+        indicating spans overlapping at least one token
+    """
+    batched = offsets.dim() == 3
+    if not batched:
+        offsets, states, spans = (
+            offsets.unsqueeze(0), states.unsqueeze(0), spans.unsqueeze(0))
+    spans = torch.as_tensor(spans, device=offsets.device)
+    # Overlap mask of shape [B, S, T]
+    starts = torch.maximum(
+        spans[:, :, 0].unsqueeze(2), offsets[:, :, 0].unsqueeze(1))
+    ends = torch.minimum(
+        spans[:, :, 1].unsqueeze(2), offsets[:, :, 1].unsqueeze(1))
+    overlap = starts <= ends
+    if attention_mask is not None:
+        overlap &= attention_mask.bool().unsqueeze(1)
+    weights = overlap.to(states.dtype)
+    counts = weights.sum(dim=2, keepdim=True)
+    pooled = torch.bmm(weights, states) / counts.clamp(min=1)
+    found = counts.squeeze(2) > 0
+    if not batched:
+        pooled, found = pooled.squeeze(0), found.squeeze(0)
+    return pooled, found
+
+def mean_encoding(offsets, states, start, end):
+    """ Returns mean encoding for given character span. 
+    
+    Args:
+        offsets: character offsets of tokens
+        states: hidden states of tokens
+        start: start of character span
+        end: end of character span
+    
+    Returns:
+        mean of states of tokens overlapping span or None
+    """
+    pooled, found = pool_spans(offsets, states, torch.tensor([[start, end]]))
     # Truncation may lead to empty states
-    if not m_states:
-        return None
-    else:
-        stacked = torch.Tensor(m_states)
-        return torch.mean(stacked, dim=0)
\ No newline at end of file
+    return pooled[0] if found[0] else None
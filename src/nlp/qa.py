@@ -0,0 +1,119 @@
+'''
+Batched extractive question answering.
+'''
+import numpy as np
+import torch
+
+def answer(qa_pipeline, questions, contexts, batch_size, max_seq_len=384,
+           doc_stride=128, max_answer_len=15):
+    """ Answers questions with the model of a pipeline on padded batches.
+
+    Long contexts are split into overlapping spans and the best answer
+    is selected as in the question answering pipeline (with a fast
+    tokenizer, top-1 answer, no impossible answers). Spans of all
+    questions are padded to the same length and scored in batches.
+
+    Args:
+        qa_pipeline: question answering pipeline
+        questions: list of questions
+        contexts: list of contexts (same length as questions)
+        batch_size: number of spans per model invocation
+        max_seq_len: maximal number of tokens per span
+        doc_stride: overlap between consecutive spans (in tokens)
+        max_answer_len: maximal number of tokens in answers
+
+    Returns:
+        list of (answer, score) tuples, one per question
+    """
+    tokenizer = qa_pipeline.tokenizer
+    model = qa_pipeline.model
+    if not tokenizer.is_fast:
+        results = [qa_pipeline(question=q, context=c)
+                   for q, c in zip(questions, contexts)]
+        return [(r['answer'], r['score']) for r in results]
+    if not questions:
+        return []
+
+    question_first = tokenizer.padding_side == 'right'
+    context_idx = 1 if question_first else 0
+    encodings = tokenizer(
+        questions if question_first else contexts,
+        contexts if question_first else questions,
+        padding=True, truncation='only_second' if question_first \
+            else 'only_first', max_length=max_seq_len, stride=doc_stride,
+        return_tensors='np', return_overflowing_tokens=True,
+        return_offsets_mapping=True)
+    nr_spans = len(encodings['input_ids'])
+    # Tokens from the context (and the CLS token) may start or end answers
+    p_mask = np.ones(encodings['input_ids'].shape, dtype=bool)
+    for span_idx in range(nr_spans):
+        for token_idx, seq_id in enumerate(encodings.sequence_ids(span_idx)):
+            if seq_id == context_idx:
+                p_mask[span_idx, token_idx] = False
+    if tokenizer.cls_token_id is not None:
+        p_mask[encodings['input_ids'] == tokenizer.cls_token_id] = False
+    undesired = p_mask | (encodings['attention_mask'] == 0)
+
+    starts = []
+    ends = []
+    input_names = tokenizer.model_input_names
+    with torch.inference_mode():
+        for start in range(0, nr_spans, batch_size):
+            inputs = {
+                k:torch.tensor(encodings[k][start:start+batch_size]).long()\
+                .to(model.device) for k in input_names if k in encodings}
+            outputs = model(**inputs)
+            starts.append(outputs.start_logits.float().cpu().numpy())
+            ends.append(outputs.end_logits.float().cpu().numpy())
+    start_probs = _masked_softmax(np.concatenate(starts), undesired)
+    end_probs = _masked_softmax(np.concatenate(ends), undesired)
+
+    best = [('', -1.0)] * len(questions)
+    span_to_sample = encodings['overflow_to_sample_mapping']
+    for span_idx in range(nr_spans):
+        token_start, token_end, score = _best_span(
+            start_probs[span_idx], end_probs[span_idx], max_answer_len)
+        sample_idx = span_to_sample[span_idx]
+        if score > best[sample_idx][1]:
+            enc = encodings[span_idx]
+            char_start = enc.word_to_chars(
+                enc.token_to_word(token_start), sequence_index=context_idx)[0]
+            char_end = enc.word_to_chars(
+                enc.token_to_word(token_end), sequence_index=context_idx)[1]
+            text = contexts[sample_idx][char_start:char_end]
+            best[sample_idx] = (text, score)
+    return best
+
+def _masked_softmax(logits, undesired):
+    """ Normalizes logits per span, excluding undesired tokens.
+
+    Args:
+        logits: array of shape [nr spans, nr tokens]
+        undesired: boolean array marking tokens excluded from answers
+
+    Returns:
+        probabilities with the probability of the first token set to zero
+    """
+    logits = np.where(undesired, -10000.0, logits)
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    probs = np.exp(logits)
+    probs = probs / probs.sum(axis=-1, keepdims=True)
+    probs[:, 0] = 0.0
+    return probs
+
+def _best_span(start_probs, end_probs, max_answer_len):
+    """ Returns start token, end token, and score of most likely answer.
+
+    Args:
+        start_probs: probabilities of tokens starting the answer
+        end_probs: probabilities of tokens ending the answer
+        max_answer_len: maximal number of tokens in answers
+
+    Returns:
+        tuple of start token index, end token index, and score
+    """
+    outer = np.outer(start_probs, end_probs)
+    candidates = np.tril(np.triu(outer), max_answer_len - 1)
+    token_start, token_end = np.unravel_index(
+        np.argmax(candidates), candidates.shape)
+    return token_start, token_end, candidates[token_start, token_end].item()
@@ -0,0 +1,51 @@
+'''
+Similarity search over embeddings of a fixed item catalog.
+'''
+import torch
+
+class SimilarityIndex():
+    """ Finds catalog items with maximal cosine similarity to queries. """
+    
+    def __init__(self, items, embeddings, chunk_size=4096):
+        """ Indexes given items, represented by their embeddings.
+        
+        Args:
+            items: list of catalog items (e.g., parameter names)
+            embeddings: tensor with one embedding row per item
+            chunk_size: maximal number of queries scored at once
+        """
+        self.items = items
+        self.embeddings = torch.nn.functional.normalize(embeddings, dim=1)
+        self.chunk_size = chunk_size
+    
+    def top_k(self, queries, k=1):
+        """ Returns most similar items for each query embedding.
+        
+        Queries are scored against the whole catalog by one matrix
+        multiplication per chunk, bounding memory consumption by
+        the chunk size and the number of items.
+        
+        Args:
+            queries: tensor with one query embedding per row
+            k: number of items to return per query
+        
+        Returns:
+            list containing a list of k items (most similar first) per query
+        """
+        k = min(k, len(self.items))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        queries = torch.nn.functional.normalize(
+            queries.to(self.embeddings.device), dim=1)
+        results = []
+        with torch.no_grad():
+            for chunk in torch.split(queries, self.chunk_size):
+                similarities = chunk @ self.embeddings.T
+                if k == 1:
+                    # Ties are resolved in favor of the first item
+                    indices = similarities.argmax(dim=1, keepdim=True)
+                else:
+                    indices = similarities.topk(k, dim=1).indices
+                results += [[self.items[i] for i in row] 
+                            for row in indices.tolist()]
+        return results
@@ -0,0 +1,27 @@
+'''
+Tests for pooling token encodings over character spans.
+'''
+from nlp.nlp_util import mean_encoding, pool_spans
+import torch
+import unittest
+
+class TestNlpUtil(unittest.TestCase):
+    """ Test pooling of token encodings. """
+    
+    def test_pooling(self):
+        """ Test pooling for single spans and batches of passages. """
+        offsets = torch.tensor([[0, 0], [0, 4], [5, 9], [9, 12], [0, 0]])
+        states = torch.arange(10, dtype=torch.float32).view(5, 2)
+        pooled = mean_encoding(offsets, states, 6, 9)
+        self.assertTrue(torch.allclose(pooled, torch.tensor([5.0, 6.0])))
+        self.assertIsNone(mean_encoding(offsets, states, 13, 20))
+        
+        offsets = torch.stack([offsets, offsets.flip(0)])
+        states = torch.stack([states, states])
+        mask = torch.tensor([[1, 1, 1, 1, 0], [1, 1, 1, 1, 1]])
+        spans = torch.tensor([[[0, 4], [13, 20]], [[5, 8], [0, 0]]])
+        pooled, found = pool_spans(offsets, states, spans, mask)
+        self.assertEqual(found.tolist(), [[True, False], [True, True]])
+        expected = torch.tensor([
+            [[1.0, 2.0], [0.0, 0.0]], [[4.0, 5.0], [14/3, 17/3]]])
+        self.assertTrue(torch.allclose(pooled, expected))
@@ -0,0 +1,29 @@
+'''
+Tests for selecting answers of question answering models.
+'''
+from nlp.qa import _best_span, _masked_softmax
+import numpy as np
+import unittest
+
+class TestQa(unittest.TestCase):
+    """ Test answer selection from model outputs. """
+    
+    def test_masked_softmax(self):
+        """ Test normalization over tokens that may belong to answers. """
+        logits = np.array([[5.0, 1.0, 2.0, 9.0], [0.0, 3.0, 3.0, 0.0]])
+        undesired = np.array([[False, False, False, True]] * 2)
+        probs = _masked_softmax(logits, undesired)
+        self.assertEqual(probs[0, 0], 0.0)
+        self.assertAlmostEqual(probs[0, 3], 0.0)
+        self.assertAlmostEqual(probs[1, 1], probs[1, 2])
+        expected = np.exp([0.0, 3.0, 3.0]) / np.exp([0.0, 3.0, 3.0]).sum()
+        self.assertTrue(np.allclose(probs[1, 1:3], expected[1:]))
+    
+    def test_best_span(self):
+        """ Test selection of most likely span with bounded length. """
+        start_probs = np.array([0.0, 0.1, 0.6, 0.3])
+        end_probs = np.array([0.0, 0.7, 0.1, 0.2])
+        self.assertEqual(_best_span(start_probs, end_probs, 5)[:2], (2, 3))
+        self.assertEqual(_best_span(start_probs, end_probs, 1)[:2], (1, 1))
+        _, _, score = _best_span(start_probs, end_probs, 5)
+        self.assertAlmostEqual(score, 0.6 * 0.2)
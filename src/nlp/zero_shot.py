@@ -0,0 +1,51 @@
+'''
+Batched zero-shot classification via natural language inference models.
+'''
+import torch
+
+def entailment_logits(classifier, premises, hypotheses, batch_size):
+    """ Scores (premise, hypothesis) pairs with the model of a pipeline.
+
+    Args:
+        classifier: zero-shot classification pipeline
+        premises: list of premises
+        hypotheses: list of hypotheses (same length as premises)
+        batch_size: number of pairs per model invocation
+
+    Returns:
+        tensor with entailment logit for each pair
+    """
+    model = classifier.model
+    tokenizer = classifier.tokenizer
+    entail_id = classifier.entailment_id
+    logits = []
+    with torch.inference_mode():
+        for start in range(0, len(premises), batch_size):
+            inputs = tokenizer(
+                premises[start:start+batch_size],
+                hypotheses[start:start+batch_size],
+                padding=True, truncation='only_first',
+                return_tensors='pt').to(model.device)
+            batch_logits = model(**inputs).logits
+            logits.append(batch_logits[:, entail_id].float().cpu())
+    return torch.cat(logits) if logits else torch.zeros(0)
+
+def classify(
+        classifier, texts, labels, batch_size,
+        template='This example is {}.'):
+    """ Classifies texts, scoring labels like the single-label pipeline.
+
+    Args:
+        classifier: zero-shot classification pipeline
+        texts: list of texts to classify
+        labels: candidate labels
+        batch_size: number of (text, label) pairs per model invocation
+        template: template for hypotheses, formatted with labels
+
+    Returns:
+        tensor of shape [nr texts, nr labels] with label probabilities
+    """
+    premises = [text for text in texts for _ in labels]
+    hypotheses = [template.format(label) for _ in texts for label in labels]
+    logits = entailment_logits(classifier, premises, hypotheses, batch_size)
+    return logits.view(len(texts), len(labels)).softmax(dim=1)
@@ -0,0 +1,131 @@
+'''
+Catalog of tuning parameter names, supporting fast lookups in text.
+'''
+from collections import deque
+
+class ParameterCatalog():
+    """ Set of parameter names with a multi-pattern matcher over names.
+
+    Names are located in text by an Aho-Corasick automaton, scanning
+    the text once, independently of the number of parameters. Matches
+    must not be directly preceded or followed by identifier characters
+    (letters, digits, underscores). Names may contain other characters
+    such as dots (e.g., CockroachDB cluster settings).
+
+    By default, only compound names (containing underscores or dots) are
+    matched in text. Single words such as "port" or "fsync" are frequent
+    in documents without referring to the parameter. All names count for
+    membership checks.
+    """
+
+    def __init__(self, names, match_simple=False):
+        """ Builds catalog and matcher for given parameter names.
+
+        Args:
+            names: names of all tuning parameters
+            match_simple: whether to match names without underscores or dots
+        """
+        self.names = frozenset(names)
+        self.match_simple = match_simple
+        # State 0 is the root, states are indices into the following lists
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for name in self.names:
+            if match_simple or _is_compound(name):
+                self._add_pattern(name)
+        self._build_failure_links()
+
+    def __contains__(self, name):
+        """ Returns True iff name is a parameter. """
+        return name in self.names
+
+    def __iter__(self):
+        """ Iterates over parameter names. """
+        return iter(self.names)
+
+    def __len__(self):
+        """ Returns number of parameters. """
+        return len(self.names)
+
+    def find(self, text):
+        """ Finds all references to parameters in text.
+
+        Args:
+            text: search for parameter names in this text
+
+        Returns:
+            list of (start, end, name) tuples, ordered by end position
+        """
+        matches = []
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        root = goto[0]
+        for pos, char in enumerate(text):
+            if not state and char not in root:
+                continue
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for name in output[state]:
+                start = pos + 1 - len(name)
+                if self._at_boundary(text, start, pos + 1):
+                    matches.append((start, pos + 1, name))
+        return matches
+
+    def names_in(self, text):
+        """ Returns names of parameters referenced in text, in text order.
+
+        Args:
+            text: search for parameter names in this text
+
+        Returns:
+            list of distinct parameter names, ordered by first occurrence
+        """
+        first_matches = {}
+        for start, _, name in self.find(text):
+            first_matches.setdefault(name, start)
+        return sorted(first_matches, key=lambda n:first_matches[n])
+
+    def _add_pattern(self, name):
+        """ Adds name to the trie underlying the automaton. """
+        state = 0
+        for char in name:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        if name:
+            self._output[state].append(name)
+
+    def _build_failure_links(self):
+        """ Links states to their longest proper suffix in the trie. """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + \
+                    self._output[self._fail[next_state]]
+
+    @staticmethod
+    def _at_boundary(text, start, end):
+        """ Returns True iff span is not part of a longer identifier. """
+        return not (start > 0 and _is_ident(text[start - 1])) and \
+            not (end < len(text) and _is_ident(text[end]))
+
+def _is_compound(name):
+    """ Returns True iff name consists of multiple (separated) words. """
+    return '_' in name or '.' in name
+
+def _is_ident(char):
+    """ Returns True iff character may be part of an identifier. """
+    return char.isalnum() or char == '_'
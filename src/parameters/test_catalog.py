@@ -0,0 +1,35 @@
+'''
+Tests for matching parameter names in text.
+'''
+from parameters.catalog import ParameterCatalog
+import unittest
+
+class TestParameterCatalog(unittest.TestCase):
+    """ Test parameter catalog. """
+    
+    def test_find(self):
+        """ Test membership checks and finding references in text. """
+        catalog = ParameterCatalog([
+            'work_mem', 'maintenance_work_mem', 'shared_buffers', 
+            'sql.defaults.distsql', 'port'])
+        self.assertIn('work_mem', catalog)
+        self.assertNotIn('work', catalog)
+        self.assertEqual(len(catalog), 5)
+        self.assertIn('port', catalog)
+        text = 'Set maintenance_work_mem=1GB, work_mem to 64MB ' \
+            'and sql.defaults.distsql. Not my_work_mem or work_mems.'
+        self.assertEqual(catalog.find(text), [
+            (4, 24, 'maintenance_work_mem'), (30, 38, 'work_mem'),
+            (51, 71, 'sql.defaults.distsql')])
+        self.assertEqual(
+            catalog.names_in('shared_buffers, work_mem, shared_buffers'),
+            ['shared_buffers', 'work_mem'])
+        self.assertEqual(catalog.find(''), [])
+    
+    def test_simple_names(self):
+        """ Test matching names without underscores or dots. """
+        text = 'Change port before work_mem.'
+        catalog = ParameterCatalog(['port', 'work_mem'])
+        self.assertEqual(catalog.names_in(text), ['work_mem'])
+        catalog = ParameterCatalog(['port', 'work_mem'], match_simple=True)
+        self.assertEqual(catalog.names_in(text), ['port', 'work_mem'])
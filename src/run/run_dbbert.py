@@ -10,10 +10,9 @@ from pybullet_utils.util import set_global_seeds
 import argparse
 import benchmark.factory
 import dbms.factory
+import dbms.instances
 import numpy as np
 import random
-import time
-import torch
 
 
 if __name__ == '__main__':
@@ -52,6 +51,16 @@ if __name__ == '__main__':
     parser.add_argument(
         '--min_batch_size', type=int, default=8,
         help='Batch size when processing text via language models')
+    parser.add_argument(
+        '--lazy_hints', type=int, default=0, choices={0, 1},
+        help='Set to 1 to start tuning while hints are still extracted')
+    parser.add_argument(
+        '--pipeline', type=int, default=0, choices={0, 1},
+        help='Set to 1 to prepare next episode while benchmarks run ' \
+        '(only with --lazy_hints 1)')
+    parser.add_argument(
+        '--nr_workers', type=int, default=1,
+        help='Number of processes extracting hints from documents')
     parser.add_argument(
         'memory', type=int, default=8000000,
         help='Main memory of target system, measured in bytes')
@@ -78,6 +87,15 @@ if __name__ == '__main__':
         help='Path to file containing SQL queries')
     parser.add_argument(
         '--nr_runs', type=int, default=1, help='Number of benchmark runs')
+    parser.add_argument(
+        '--hint_cache_dir', type=str, default=None,
+        help='Directory caching extracted hints across runs (optional)')
+    parser.add_argument(
+        '--obs_dir', type=str, default=None,
+        help='Directory storing observations across runs (optional)')
+    parser.add_argument(
+        '--base_text_path', type=str, default=None,
+        help='Previous version of input text (only extract hints for changes)')
     parser.add_argument(
         '--result_path_prefix', type=str, default='dbbert_results',
         help='Path prefix for files containing tuning results')
@@ -99,14 +117,56 @@ if __name__ == '__main__':
     parser.add_argument(
         '--benchbase_timeout', type=int, default=300,
         help='Timeout for benchbase benchmarks in seconds')
+    parser.add_argument(
+        '--nlp_backend', type=str, default='fp32', 
+        choices={'fp32', 'int8', 'onnx'},
+        help='Inference backend for language models (int8 and onnx on CPU, ' \
+        'onnx requires optional dependencies)')
+    parser.add_argument(
+        '--eval_reuse', type=str, default='never', 
+        choices={'never', 'always', 'noise', 'refresh'},
+        help='Policy for reusing results of previously benchmarked configurations')
+    parser.add_argument(
+        '--eval_cache_path', type=str, default=None,
+        help='JSON file storing benchmark results across runs (optional)')
+    parser.add_argument(
+        '--eval_noise_budget', type=float, default=0.05,
+        help='Maximal relative spread of repeated measurements (noise policy)')
+    parser.add_argument(
+        '--eval_max_hits', type=int, default=3,
+        help='Re-measure after reusing results so many times (refresh policy)')
+    parser.add_argument(
+        '--replica_ports', type=str, default=None,
+        help='Comma-separated ports of DBMS replicas for parallel evaluations')
+    parser.add_argument(
+        '--local_instances', type=int, default=0,
+        help='Number of local DBMS instances to create (first one is tuned)')
+    parser.add_argument(
+        '--instance_dir', type=str, default='dbms_instances',
+        help='Directory containing data of local instances')
+    parser.add_argument(
+        '--instance_port', type=int, default=15432,
+        help='Port of first local instance (others use following ports)')
+    parser.add_argument(
+        '--golden_dir', type=str, default=None,
+        help='Data directory to clone for local instances (initialize if not set)')
+    parser.add_argument(
+        '--db_bin_dir', type=str, default=None,
+        help='Directory containing DBMS server binaries for local instances')
     args = parser.parse_args()
     print(f'Input arguments: {args}')
     # Expensive import statements after parsing arguments
+    import models.backend
+    models.backend.set_backend(args.nlp_backend)
+    import torch
     from environment.zero_shot import NlpTuningEnv
     from stable_baselines3 import A2C
+    from models.callbacks import TimeBudgetCallback
     from doc.collection import DocCollection
     from stable_baselines3.common.utils import set_random_seed
     import environment.multi_doc
+    import search.eval_cache
+    import search.scheduler
     
     device = 'cuda' if torch.cuda.is_available() else 'cpu'
     hint_order = [
@@ -114,21 +174,45 @@ if __name__ == '__main__':
         environment.multi_doc.HintOrder.BY_PARAMETER, 
         environment.multi_doc.HintOrder.BY_STRIDE][args.hint_order]
     
-    dbms = dbms.factory.from_args(args)
+    pool = dbms.instances.from_args(args)
+    if pool:
+        dbms, *replicas = [
+            dbms.factory.from_instance(args, i) for i in pool.instances]
+    else:
+        replicas = dbms.factory.replicas_from_args(args)
+        dbms = dbms.factory.from_args(args)
     objective, bench = benchmark.factory.from_args(args, dbms)
+    replica_benches = [benchmark.factory.from_args(args, r)[1] for r in replicas]
+    eval_cache = search.eval_cache.from_args(args, dbms)
+    scheduler = None
+    if replicas:
+        scheduler = search.scheduler.EvaluationScheduler(
+            [(dbms, bench)] + list(zip(replicas, replica_benches)), eval_cache)
     
     for run_ctr in range(args.nr_runs):
         # Initialize for new run
         dbms.reset_config()
         dbms.reconfigure()
         bench.reset(args.result_path_prefix, run_ctr)
+        for replica, replica_bench in zip(replicas, replica_benches):
+            replica.reset_config()
+            replica.reconfigure()
+            replica_bench.reset(
+                f'{args.result_path_prefix}_{replica.port}', run_ctr)
         
         # Initialize input documents
+        base_path = args.base_text_path or args.text_source_path
         docs = DocCollection(
-            docs_path=args.text_source_path, dbms=dbms, 
+            docs_path=base_path, dbms=dbms, 
             size_threshold=args.max_length,
             use_implicit=args.use_implicit, 
-            filter_params=args.filter_params)
+            filter_params=args.filter_params,
+            batch_size=args.min_batch_size,
+            cache_dir=args.hint_cache_dir or None,
+            nr_workers=args.nr_workers,
+            lazy=args.lazy_hints == 1)
+        if base_path != args.text_source_path:
+            docs.update(args.text_source_path)
         
         # Initialize environment
         set_random_seed(0)
@@ -142,7 +226,10 @@ if __name__ == '__main__':
             dbms=dbms, benchmark=bench, hardware=hardware, 
             hints_per_episode=args.nr_hints, nr_evals=args.nr_evaluations, 
             scale_perf=args.performance_scaling, 
-            scale_asg=args.assignment_scaling, objective=objective)
+            scale_asg=args.assignment_scaling, objective=objective,
+            batch_size=args.min_batch_size, obs_dir=args.obs_dir or None,
+            pipeline=args.pipeline == 1, eval_cache=eval_cache, 
+            scheduler=scheduler)
         unsupervised_env.reset()
         
         # Initialize agents
@@ -150,10 +237,10 @@ if __name__ == '__main__':
             'MlpPolicy', unsupervised_env, 
             verbose=1, normalize_advantage=True)
         
-        # Start benchmark run
-        start_s = time.time()
-        for i in range(args.nr_frames):
-            model.learn(total_timesteps=1)            
-            elapsed_s = time.time() - start_s
-            if elapsed_s > args.timeout_s:
-                break
\ No newline at end of file
+        # Start benchmark run (each frame is one rollout)
+        callback = TimeBudgetCallback(args.timeout_s)
+        model.learn(
+            total_timesteps=args.nr_frames * model.n_steps, 
+            callback=callback)
+        if eval_cache:
+            eval_cache.print_stats()
\ No newline at end of file
@@ -5,9 +5,9 @@ from pybullet_utils.util import set_global_seeds
 import argparse
 import benchmark.factory
 import dbms.factory
+import dbms.instances
 import numpy as np
 import random
-import torch
 
 
 if __name__ == '__main__':
@@ -77,16 +77,73 @@ if __name__ == '__main__':
     parser.add_argument(
         '--benchbase_timeout', type=int, default=300,
         help='Timeout for benchbase benchmarks in seconds')
+    parser.add_argument(
+        '--nlp_backend', type=str, default='fp32', 
+        choices={'fp32', 'int8', 'onnx'},
+        help='Inference backend for language models (int8 and onnx on CPU, ' \
+        'onnx requires optional dependencies)')
+    parser.add_argument(
+        '--eval_reuse', type=str, default='never', 
+        choices={'never', 'always', 'noise', 'refresh'},
+        help='Policy for reusing results of previously benchmarked configurations')
+    parser.add_argument(
+        '--eval_cache_path', type=str, default=None,
+        help='JSON file storing benchmark results across runs (optional)')
+    parser.add_argument(
+        '--eval_noise_budget', type=float, default=0.05,
+        help='Maximal relative spread of repeated measurements (noise policy)')
+    parser.add_argument(
+        '--eval_max_hits', type=int, default=3,
+        help='Re-measure after reusing results so many times (refresh policy)')
+    parser.add_argument(
+        '--elites', type=int, default=0, 
+        help='Number of best chromosomes carried over to next generation ' \
+        '(e.g., 2, default 0 keeps previous behavior)')
+    parser.add_argument(
+        '--replica_ports', type=str, default=None,
+        help='Comma-separated ports of DBMS replicas for parallel evaluations')
+    parser.add_argument(
+        '--local_instances', type=int, default=0,
+        help='Number of local DBMS instances to create (first one is tuned)')
+    parser.add_argument(
+        '--instance_dir', type=str, default='dbms_instances',
+        help='Directory containing data of local instances')
+    parser.add_argument(
+        '--instance_port', type=int, default=15432,
+        help='Port of first local instance (others use following ports)')
+    parser.add_argument(
+        '--golden_dir', type=str, default=None,
+        help='Data directory to clone for local instances (initialize if not set)')
+    parser.add_argument(
+        '--db_bin_dir', type=str, default=None,
+        help='Directory containing DBMS server binaries for local instances')
     args = parser.parse_args()
     print(f'Input arguments: {args}')
     # Expensive import statements after parsing arguments
+    import models.backend
+    models.backend.set_backend(args.nlp_backend)
+    import torch
     from doc.collection import DocCollection
     from search.genetic_search import GeneticExplorer
+    import search.eval_cache
+    import search.scheduler
     
     device = 'cuda' if torch.cuda.is_available() else 'cpu'
     
-    dbms = dbms.factory.from_args(args)
+    pool = dbms.instances.from_args(args)
+    if pool:
+        dbms, *replicas = [
+            dbms.factory.from_instance(args, i) for i in pool.instances]
+    else:
+        replicas = dbms.factory.replicas_from_args(args)
+        dbms = dbms.factory.from_args(args)
     objective, bench = benchmark.factory.from_args(args, dbms)
+    replica_benches = [benchmark.factory.from_args(args, r)[1] for r in replicas]
+    eval_cache = search.eval_cache.from_args(args, dbms)
+    scheduler = None
+    if replicas:
+        scheduler = search.scheduler.EvaluationScheduler(
+            [(dbms, bench)] + list(zip(replicas, replica_benches)), eval_cache)
         
     # Initialize input documents
     docs = DocCollection(
@@ -97,12 +154,17 @@ if __name__ == '__main__':
     
     # Initialize environment
     bench.reset(args.result_path_prefix, 0)
+    for replica, replica_bench in zip(replicas, replica_benches):
+        replica_bench.reset(f'{args.result_path_prefix}_{replica.port}', 0)
     random.seed(1)
     np.random.seed(1)
     torch.manual_seed(0)
     set_global_seeds(0)
     hardware = {'memory':args.memory, 'disk':args.disk, 'cores':args.cores}
     explorer = GeneticExplorer(docs, hardware, dbms, bench, objective, 
-                               args.population, args.crossover, args.mutations) 
+                               args.population, args.crossover, args.mutations, 
+                               eval_cache, args.elites, scheduler) 
     explorer.explore(args.generations)
+    if eval_cache:
+        eval_cache.print_stats()
         
\ No newline at end of file
@@ -0,0 +1,227 @@
+'''
+Cache of benchmark results, shared by explorers across episodes and runs.
+'''
+from parameters.util import convert_to_bytes, decompose_val, is_numerical
+import enum
+import json
+import os
+
+byte_units = {'k', 'kb', 'm', 'mb', 'g', 'gb'}
+
+class ReusePolicy(enum.IntEnum):
+    """ Decides when cached benchmark results are reused. """
+    ALWAYS=0, # reuse any previous successful measurement
+    NOISE=1, # reuse once repeated successful measurements agree
+    REFRESH=2, # re-measure after a fixed number of reuses
+
+def canonical_value(value):
+    """ Normalizes parameter value for comparisons.
+
+    Args:
+        value: parameter value (possibly with unit)
+
+    Returns:
+        string representation, using bytes for values with size units
+    """
+    if is_numerical(value):
+        number, unit = decompose_val(value)
+        unit = unit.lower()
+        if unit in byte_units:
+            return repr(float(convert_to_bytes(value)))
+        return repr(float(number)) + unit
+    return str(value).strip().lower()
+
+def canonical_config(config):
+    """ Normalizes configuration for comparisons.
+
+    Args:
+        config: dictionary mapping parameters to values
+
+    Returns:
+        sorted list of (lower case parameter, normalized value) pairs
+    """
+    return sorted(
+        (str(p).lower(), canonical_value(v)) for p, v in config.items())
+
+def config_key(config):
+    """ Returns string identifying equivalent configurations.
+
+    Args:
+        config: dictionary mapping parameters to values
+
+    Returns:
+        JSON representation of canonical configuration
+    """
+    return json.dumps(canonical_config(config))
+
+class EvaluationCache():
+    """ Maps configurations to previously measured benchmark metrics. """
+
+    def __init__(
+            self, path=None, context=None, policy=ReusePolicy.ALWAYS,
+            noise_budget=0.05, max_hits=3):
+        """ Initializes cache, reading entries from disk if available.
+
+        Args:
+            path: JSON file persisting the cache (in memory if None)
+            context: JSON-compatible settings determining metrics
+            policy: decides when to reuse cached metrics
+            noise_budget: maximal relative spread of metrics (NOISE policy)
+            max_hits: reuse metrics so many times (REFRESH policy)
+        """
+        self.path = path
+        self.context = context
+        self.policy = policy
+        self.noise_budget = noise_budget
+        self.max_hits = max_hits
+        self.entries = {}
+        self.nr_hits = 0
+        self.nr_misses = 0
+        if path and os.path.exists(path):
+            with open(path) as file:
+                stored = json.load(file)
+            if stored['context'] == json.loads(json.dumps(context)):
+                self.entries = stored['entries']
+            else:
+                print(f'Ignoring evaluations in {path} (different context)')
+
+    def lookup(self, config):
+        """ Returns metrics for configuration if they can be reused.
+
+        Args:
+            config: dictionary mapping parameters to values
+
+        Returns:
+            metrics (averaged over measurements) or None
+        """
+        entry = self.entries.get(config_key(config))
+        if entry is None or not self._reusable(entry):
+            self.nr_misses += 1
+            return None
+        self.nr_hits += 1
+        entry['hits'] += 1
+        # Reuse counts only affect later decisions under the refresh policy
+        if self.policy == ReusePolicy.REFRESH:
+            self._save()
+        return self._aggregate(entry['metrics'])
+
+    def record(self, config, metrics):
+        """ Adds measured metrics for given configuration.
+
+        Args:
+            config: dictionary mapping parameters to values
+            metrics: dictionary with error flag and performance metrics
+        """
+        key = config_key(config)
+        entry = self.entries.setdefault(key, {'metrics':[], 'hits':0})
+        entry['metrics'].append(metrics)
+        entry['hits'] = 0
+        self._save()
+
+    def print_stats(self):
+        """ Prints out number of cache hits and misses. """
+        print(f'Evaluation cache: {self.nr_hits} hits, ' \
+              f'{self.nr_misses} misses, {len(self.entries)} configurations')
+
+    def _aggregate(self, measurements):
+        """ Averages metrics over successful measurements.
+
+        Args:
+            measurements: list of metric dictionaries (one successful)
+
+        Returns:
+            dictionary with averaged metrics
+        """
+        valid = [m for m in measurements if not m['error']]
+        metrics = {'error': False}
+        for name in valid[0]:
+            if name != 'error':
+                metrics[name] = sum(m[name] for m in valid) / len(valid)
+        return metrics
+
+    def _reusable(self, entry):
+        """ Checks whether metrics in cache entry can be reused.
+
+        Args:
+            entry: dictionary with measured metrics and reuse count
+
+        Returns:
+            True iff metrics should be reused according to policy
+        """
+        # Failures may be transient, always retry them
+        valid = [m for m in entry['metrics'] if not m['error']]
+        if not valid:
+            return False
+        if self.policy == ReusePolicy.ALWAYS:
+            return True
+        elif self.policy == ReusePolicy.REFRESH:
+            return entry['hits'] < self.max_hits
+        if len(valid) < 2:
+            return False
+        for name in valid[0]:
+            if name != 'error':
+                values = [m[name] for m in valid]
+                mean = sum(values) / len(values)
+                spread = max(values) - min(values)
+                if spread > self.noise_budget * abs(mean):
+                    return False
+        return True
+
+    def _save(self):
+        """ Writes cache entries to disk if a path is specified. """
+        if self.path:
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump({'context':self.context, 'entries':self.entries}, file)
+            os.replace(tmp_path, self.path)
+
+def measure_config(dbms, benchmark, config, eval_cache=None):
+    """ Returns metrics for configuration, benchmarking only if necessary.
+
+    Args:
+        dbms: configure this database system
+        benchmark: run this benchmark
+        config: dictionary mapping parameters to values
+        eval_cache: reuse metrics from this cache if not None
+
+    Returns:
+        dictionary with error flag and performance metrics
+    """
+    if eval_cache:
+        metrics = eval_cache.lookup(config)
+        if metrics is not None:
+            print(f'Reusing metrics {metrics} for configuration: {config}')
+            return metrics
+    dbms.reset_config()
+    print(f'Trying configuration: {config}')
+    for param, value in config.items():
+        dbms.set_param_smart(param, value)
+    if dbms.reconfigure():
+        metrics = benchmark.evaluate()
+    else:
+        metrics = {'error': True}
+    if eval_cache:
+        eval_cache.record(config, metrics)
+    return metrics
+
+def from_args(args, dbms):
+    """ Generates evaluation cache from command line arguments.
+
+    Args:
+        args: dictionary containing command line arguments
+        dbms: represents database system executing benchmark
+
+    Returns:
+        evaluation cache or None if results are not reused
+    """
+    if args.eval_reuse == 'never':
+        return None
+    context = {
+        'dbms': type(dbms).__name__, 'db': args.db_name,
+        'benchmark_type': args.benchmark_type, 'benchmark': args.benchmark,
+        'query_path': args.query_path,
+        'benchbase_config': args.benchbase_config}
+    policy = ReusePolicy[args.eval_reuse.upper()]
+    return EvaluationCache(
+        args.eval_cache_path, context, policy,
+        args.eval_noise_budget, args.eval_max_hits)
@@ -20,15 +20,18 @@ class ParameterResults():
 class FeatureWiseExplorer(ParameterExplorer):
     """ Explores the parameter space using previously collected tuning hints. """
 
-    def __init__(self, dbms: ConfigurableDBMS, benchmark: Benchmark, objective):
+    def __init__(self, dbms: ConfigurableDBMS, benchmark: Benchmark, objective,
+                 eval_cache=None, scheduler=None):
         """ Initializes for given benchmark and database system. 
         
         Args:
             dbms: explore parameters of this database system.
             benchmark: optimize parameters for this benchmark.
             objective: goal of parameter optimization.
+            eval_cache: reuse benchmark results from this cache (optional).
+            scheduler: evaluate configurations in parallel on replicas (optional).
         """
-        super().__init__(dbms, benchmark, objective)
+        super().__init__(dbms, benchmark, objective, eval_cache, scheduler)
         self.max_reward = 0
         self.tested_parameters = {}
 
@@ -63,8 +66,8 @@ class FeatureWiseExplorer(ParameterExplorer):
         # Identify best configuration
         max_reward = 0
         best_config = {}
-        for config in configs:
-            reward = self._evaluate_config(config)
+        rewards = self._evaluate_configs(configs)
+        for config, reward in zip(configs, rewards):
             if reward > max_reward:
                 max_reward = reward
                 best_config = config
@@ -85,13 +88,16 @@ class FeatureWiseExplorer(ParameterExplorer):
     def _evaluate_parameters(self, best_config):            
         print('Benchmarking parameters individually')  
         # Evaluate parameters
+        untested = []
         for p, val in best_config.items():
             if p in self.tested_parameters:
                 if self.tested_parameters[p].has_value(val):
                     continue
             else:
                 self.tested_parameters[p] = ParameterResults()
-            reward = self._evaluate_config({p : val})
+            untested.append((p, val))
+        rewards = self._evaluate_configs([{p : val} for p, val in untested])
+        for (p, val), reward in zip(untested, rewards):
             self.tested_parameters[p].add_result(val, reward)
             print(f'Obtained {reward} by setting {p} to {val}')
 
@@ -1,7 +1,9 @@
 from dbms.generic_dbms import ConfigurableDBMS
 from benchmark.evaluate import Benchmark
+from search.eval_cache import measure_config
 from search.objectives import calculate_reward
-from doc.collection import DocCollection, HintType
+from doc.collection import DocCollection
+from doc.hint_table import HintType
 from random import random, randint, shuffle
 from collections import defaultdict
 
@@ -9,14 +11,23 @@ class GeneticExplorer():
     """ Explores the parameter space using previously collected tuning hints. """
 
     def __init__(self, docs: DocCollection, hardware, dbms: ConfigurableDBMS, benchmark: Benchmark, objective, 
-                 population_size, p_crossover, n_mutations):
+                 population_size, p_crossover, n_mutations, eval_cache=None,
+                 nr_elites=0, scheduler=None):
         """ Initializes for given benchmark and database system. 
         
         Args:
             dbms: explore parameters of this database system.
             benchmark: optimize parameters for this benchmark.
             objective: goal of parameter optimization.
+            eval_cache: reuse benchmark results from this cache (optional).
+            nr_elites: carry over so many best chromosomes per generation.
+            scheduler: evaluate chromosomes in parallel on replicas (optional).
         """
+        self.eval_cache = eval_cache
+        self.scheduler = scheduler
+        self.nr_elites = nr_elites
+        # Maps chromosomes (as tuples) to their scores
+        self.fitness = {}
         self.docs = docs
         self.hardware = hardware
         self.dbms = dbms
@@ -26,6 +37,8 @@ class GeneticExplorer():
         self.param_to_values = self._process_hints()
         self.params, self.population = self._initialize_population()
         self.def_metrics = self._def_conf_metrics()
+        if self.dbms and self.scheduler:
+            self.scheduler.calibrate(self.def_metrics)
         self.p_mutate = n_mutations / len(self.param_to_values)
         self.p_crossover = p_crossover
     
@@ -41,19 +54,25 @@ class GeneticExplorer():
         
     def explore(self, generations):
         for generation in range(generations):            
-            scores = [self._evaluate_chromosome(c) for c in self.population]
+            nr_known = len(self.fitness)
+            self._score_population()
+            scores = [self._score(c) for c in self.population]
+            nr_evals = len(self.fitness) - nr_known
             print(f'Generation {generation}:')
             for i in range(self.population_size):
                 print(f'\tChromosome {i}: config={self._chromosome_to_config(self.population[i])}, score={scores[i]}')
+            print(f'\tEvaluated {nr_evals} chromosomes, ' \
+                  f'saved {self.population_size - nr_evals} evaluations')
             
             parents = self._select_parents(scores)
-            children = []
-            for i in range(0, self.population_size, 2):
+            children = self._select_elites(scores)
+            for i in range(0, self.population_size - len(children), 2):
                 # crossover and mutation
                 c1, c2 = self._crossover(parents[i], parents[i+1])
                 self._mutate(c1)
                 self._mutate(c2)
                 children.extend([c1, c2])
+            children = children[:self.population_size]
             print(f'Selected parents:')
             for p in parents:
                 print(f'\t{self._chromosome_to_config(p)}')
@@ -72,6 +91,52 @@ class GeneticExplorer():
             population.append(chromosome)
         return params, population
     
+    def _score(self, chromosome):
+        """ Returns score of chromosome, evaluating it only once.
+        
+        Args:
+            chromosome: list of genes
+        
+        Returns:
+            reward achieved by associated configuration
+        """
+        key = tuple(chromosome)
+        if key not in self.fitness:
+            self.fitness[key] = self._evaluate_chromosome(chromosome)
+        return self.fitness[key]
+    
+    def _score_population(self):
+        """ Evaluates new chromosomes in parallel if a scheduler is set. """
+        new_chromosomes = list(dict.fromkeys(
+            tuple(c) for c in self.population if tuple(c) not in self.fitness))
+        if self.dbms and self.scheduler and new_chromosomes:
+            configs = [self._chromosome_to_config(c) for c in new_chromosomes]
+            all_metrics = self.scheduler.measure(configs)
+            for chromosome, config, metrics in zip(
+                    new_chromosomes, configs, all_metrics):
+                reward = calculate_reward(metrics, self.def_metrics, self.objective)
+                print(f'Reward {reward} with {config}')
+                self.fitness[chromosome] = reward
+    
+    def _select_elites(self, scores):
+        """ Returns copies of distinct chromosomes with highest scores.
+        
+        Args:
+            scores: scores of chromosomes in current population
+        
+        Returns:
+            list with up to nr_elites chromosomes
+        """
+        elites = []
+        ranked = sorted(
+            range(len(scores)), key=lambda i: scores[i], reverse=True)
+        for i in ranked:
+            if len(elites) >= self.nr_elites:
+                break
+            if self.population[i] not in elites:
+                elites.append(self.population[i].copy())
+        return elites
+    
     def _select_parents(self, scores):
         # Randomly select chromosomes from the half of the population that performs best
         scored = {scores[i] : self.population[i] for i in range(len(scores))}
@@ -110,15 +175,9 @@ class GeneticExplorer():
     def _evaluate_chromosome(self, chromosome: list[int]):
         config = self._chromosome_to_config(chromosome)
         if self.dbms:
-            self.dbms.reset_config()
-            print(f'Trying configuration: {config}')
-            for param, value in config.items():
-                self.dbms.set_param_smart(param, value)
-            if self.dbms.reconfigure():
-                metrics = self.benchmark.evaluate()
-                reward = calculate_reward(metrics, self.def_metrics, self.objective)
-            else: 
-                reward = -10000
+            metrics = measure_config(
+                self.dbms, self.benchmark, config, self.eval_cache)
+            reward = calculate_reward(metrics, self.def_metrics, self.objective)
             print(f'Reward {reward} with {config}')
             return reward
         else:
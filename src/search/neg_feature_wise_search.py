@@ -5,15 +5,18 @@ from search.search_with_hints import ParameterExplorer
 class NegFeatureWiseExplorer(ParameterExplorer):
     """ Explores the parameter space using previously collected tuning hints. """
 
-    def __init__(self, dbms: ConfigurableDBMS, benchmark: Benchmark, objective):
+    def __init__(self, dbms: ConfigurableDBMS, benchmark: Benchmark, objective,
+                 eval_cache=None, scheduler=None):
         """ Initializes for given benchmark and database system. 
         
         Args:
             dbms: explore parameters of this database system.
             benchmark: optimize parameters for this benchmark.
             objective: goal of parameter optimization.
+            eval_cache: reuse benchmark results from this cache (optional).
+            scheduler: evaluate configurations in parallel on replicas (optional).
         """
-        super().__init__(dbms, benchmark, objective)
+        super().__init__(dbms, benchmark, objective, eval_cache, scheduler)
         self.max_reward = 0
         self.best_parameters = {}
 
@@ -48,8 +51,8 @@ class NegFeatureWiseExplorer(ParameterExplorer):
         # Identify best configuration
         max_reward = 0
         best_config = {}
-        for config in configs:
-            reward = self._evaluate_config(config)
+        rewards = self._evaluate_configs(configs)
+        for config, reward in zip(configs, rewards):
             if reward > max_reward:
                 max_reward = reward
                 best_config = config
@@ -69,10 +72,13 @@ class NegFeatureWiseExplorer(ParameterExplorer):
         print('Benchmarking parameters individually')  
         self.best_parameters = {}
         # Evaluate parameters
-        for p, val in best_config.items():
+        configs = []
+        for p in best_config:
             config = best_config.copy()
             del config[p]
-            reward = self._evaluate_config(config)
+            configs.append(config)
+        rewards = self._evaluate_configs(configs)
+        for (p, val), reward in zip(best_config.items(), rewards):
             loss = max_reward - reward
             if loss > 2:
                 self.best_parameters[p] = val
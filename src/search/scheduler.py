@@ -0,0 +1,114 @@
+'''
+Evaluates configurations in parallel on a pool of DBMS replicas.
+'''
+from search.eval_cache import config_key, measure_config
+import concurrent.futures
+import queue
+
+class EvaluationScheduler():
+    """ Dispatches configurations to free DBMS replicas.
+
+    Replicas run the same database on separate servers (e.g., listening
+    on different ports). Each replica evaluates at most one configuration
+    at a time, using its own benchmark object.
+
+    Replicas may differ in speed and slow each other down when running
+    benchmarks in parallel. After calibration, metrics of each replica
+    are scaled to be comparable with reference metrics of the default
+    configuration (typically measured alone on the tuned DBMS).
+    """
+
+    def __init__(self, replicas, eval_cache=None):
+        """ Initializes for given replicas.
+
+        Args:
+            replicas: list of (DBMS, benchmark) pairs
+            eval_cache: reuse benchmark results from this cache (optional)
+        """
+        self.replicas = replicas
+        self.eval_cache = eval_cache
+        self.free_replicas = queue.Queue()
+        for replica_idx in range(len(replicas)):
+            self.free_replicas.put(replica_idx)
+        self.executor = concurrent.futures.ThreadPoolExecutor(len(replicas))
+        # Maps replicas to factors for each metric
+        self.scales = [{} for _ in replicas]
+
+    def calibrate(self, ref_metrics, nr_runs=2):
+        """ Measures default configuration on all replicas at once.
+
+        Replicas run the benchmark in parallel, as during evaluations.
+        Later metrics of each replica are scaled by the ratio between
+        reference metrics and the metrics of the replica.
+
+        Args:
+            ref_metrics: metrics of default configuration used for rewards
+            nr_runs: use metrics of last run (previous runs warm up caches)
+        """
+        for _ in range(nr_runs):
+            futures = [
+                self.executor.submit(measure_config, dbms, benchmark, {})
+                for dbms, benchmark in self.replicas]
+            def_metrics = [f.result() for f in futures]
+        for replica_idx, metrics in enumerate(def_metrics):
+            self.scales[replica_idx] = {}
+            if metrics['error'] or ref_metrics['error']:
+                print(f'Warning: cannot calibrate replica {replica_idx}')
+                continue
+            for name, value in metrics.items():
+                if name != 'error' and value and ref_metrics.get(name):
+                    self.scales[replica_idx][name] = ref_metrics[name] / value
+        print(f'Scaling metrics of replicas by {self.scales}')
+
+    def measure(self, configs):
+        """ Returns metrics for configurations, benchmarking in parallel.
+
+        Equivalent configurations are only evaluated once. The cache is
+        only accessed by the calling thread.
+
+        Args:
+            configs: list of configurations (mapping parameters to values)
+
+        Returns:
+            list with one dictionary of metrics per configuration
+        """
+        keys = [config_key(c) for c in configs]
+        key_to_metrics = {}
+        key_to_future = {}
+        for key, config in zip(keys, configs):
+            if key in key_to_metrics or key in key_to_future:
+                continue
+            metrics = None
+            if self.eval_cache:
+                metrics = self.eval_cache.lookup(config)
+            if metrics is None:
+                key_to_future[key] = self.executor.submit(self._measure, config)
+            else:
+                print(f'Reusing metrics {metrics} for configuration: {config}')
+                key_to_metrics[key] = metrics
+
+        for key, config in zip(keys, configs):
+            if key in key_to_future and key not in key_to_metrics:
+                key_to_metrics[key] = key_to_future[key].result()
+                if self.eval_cache:
+                    self.eval_cache.record(config, key_to_metrics[key])
+        return [key_to_metrics[key] for key in keys]
+
+    def _measure(self, config):
+        """ Benchmarks configuration on the next free replica.
+
+        Args:
+            config: dictionary mapping parameters to values
+
+        Returns:
+            dictionary with error flag and (scaled) performance metrics
+        """
+        replica_idx = self.free_replicas.get()
+        try:
+            dbms, benchmark = self.replicas[replica_idx]
+            metrics = measure_config(dbms, benchmark, config)
+        finally:
+            self.free_replicas.put(replica_idx)
+        scales = self.scales[replica_idx]
+        return {n:v * scales.get(n, 1) if n != 'error' else v
+                for n, v in metrics.items()}
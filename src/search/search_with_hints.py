@@ -7,22 +7,48 @@ from collections import defaultdict
 from dbms.generic_dbms import ConfigurableDBMS
 from benchmark.evaluate import Benchmark
 from parameters.util import is_numerical, convert_to_bytes
+from search.eval_cache import measure_config
 from search.objectives import calculate_reward
+import functools
+import numpy as np
+
+@functools.lru_cache(maxsize=None, typed=True)
+def parse_value(value):
+    """ Parses assignment value for distance calculations (cached).
+    
+    Args:
+        value: assignment value
+    
+    Returns:
+        flag indicating numerical value, byte size (NaN if unknown)
+    """
+    if is_numerical(value):
+        nr_bytes = convert_to_bytes(value)
+        return True, np.nan if nr_bytes is None else float(nr_bytes)
+    else:
+        return False, np.nan
 
 class ParameterExplorer():
     """ Explores the parameter space using previously collected tuning hints. """
 
-    def __init__(self, dbms: ConfigurableDBMS, benchmark: Benchmark, objective):
+    def __init__(self, dbms: ConfigurableDBMS, benchmark: Benchmark, objective,
+                 eval_cache=None, scheduler=None):
         """ Initializes for given benchmark and database system. 
         
         Args:
             dbms: explore parameters of this database system.
             benchmark: optimize parameters for this benchmark.
             objective: goal of parameter optimization.
+            eval_cache: reuse benchmark results from this cache (optional).
+            scheduler: evaluate configurations in parallel on replicas (optional).
         """
         self.dbms = dbms
+        self.eval_cache = eval_cache
+        self.scheduler = scheduler
         self.benchmark = benchmark
         self.def_metrics = self._def_conf_metrics()
+        if self.dbms and self.scheduler:
+            self.scheduler.calibrate(self.def_metrics)
         self.objective = objective
 
     def _def_conf_metrics(self):
@@ -52,8 +78,8 @@ class ParameterExplorer():
         # Identify best configuration
         max_reward = 0
         best_config = {}
-        for config in configs:
-            reward = self._evaluate_config(config)
+        rewards = self._evaluate_configs(configs)
+        for config, reward in zip(configs, rewards):
             if reward > max_reward:
                 max_reward = reward
                 best_config = config
@@ -78,29 +104,62 @@ class ParameterExplorer():
         return configs
          
     def _next_config(self, configs, param_to_w_vals):
-        """ Select most interesting configuration to try next. """
+        """ Select most interesting configuration to try next. 
+        
+        For each parameter, selects the value minimizing the maximal
+        weighted distance between suggested values and the closest
+        value selected for this or prior configurations (first value
+        in case of ties).
+        
+        Args:
+            configs: previously selected configurations
+            param_to_w_vals: maps parameters to value-weight pairs
+        
+        Returns:
+            dictionary mapping parameters to values
+        """
         config = {}
         for p, w_vals in param_to_w_vals.items():
-            ref_vals = [c[p] for c in configs]
             vals = [v for v, _ in w_vals]
-            min_dist = float('inf')
-            best_val = vals[0]
-            for val in vals:
-                exp_refs = ref_vals + [val]
-                exp_dist = self._max_min_distance(w_vals, exp_refs)
-                if exp_dist < min_dist:
-                    min_dist = exp_dist
-                    best_val = val
-            config[p] = best_val
+            weights = np.array([w for _, w in w_vals], dtype=np.float64)
+            ref_vals = [c[p] for c in configs]
+            ref_dists = self._distances(vals, ref_vals)
+            min_dists = ref_dists.min(axis=1, initial=np.inf)
+            # Column i: minimal distances after selecting i-th value
+            exp_dists = np.minimum(min_dists[:, None], self._distances(vals, vals))
+            max_dists = (weights[:, None] * exp_dists).max(axis=0)
+            config[p] = vals[int(np.argmin(max_dists))]
         return config
-         
-    def _max_min_distance(self, weighted_values, ref_vals):
-        """ Returns maximum of minimal distances to reference values. """
-        return max([w * self._min_distance(v, ref_vals) for v, w in weighted_values])
+    
+    def _distances(self, values_1, values_2):
+        """ Calculates distances between all pairs of values.
+        
+        Args:
+            values_1: first list of assignment values
+            values_2: second list of assignment values
         
-    def _min_distance(self, value, ref_vals):
-        """ Returns minimum distance to value over all reference values. """
-        return min([self._distance(value, r) for r in ref_vals])
+        Returns:
+            matrix of distances (see _distance), one row per first value
+        """
+        ids = {}
+        ids_1 = np.array([ids.setdefault(v, len(ids)) for v in values_1], dtype=np.int64)
+        ids_2 = np.array([ids.setdefault(v, len(ids)) for v in values_2], dtype=np.int64)
+        numerical_1, bytes_1 = self._parse_values(values_1)
+        numerical_2, bytes_2 = self._parse_values(values_2)
+        dists = np.where(numerical_1[:, None] & numerical_2[None, :], 1000.0, 10000.0)
+        with np.errstate(invalid='ignore'):
+            byte_dists = np.abs(bytes_1[:, None] - bytes_2[None, :])
+        known = ~np.isnan(byte_dists)
+        dists[known] = byte_dists[known]
+        dists[ids_1[:, None] == ids_2[None, :]] = 0
+        return dists
+    
+    def _parse_values(self, values):
+        """ Returns arrays with numerical flags and byte sizes of values. """
+        parsed = [parse_value(v) for v in values]
+        numerical = np.array([n for n, _ in parsed], dtype=bool)
+        nr_bytes = np.array([b for _, b in parsed], dtype=np.float64)
+        return numerical, nr_bytes
         
     def _distance(self, value_1, value_2):
         """ Calculate raw distance between two assignments for same value. 
@@ -138,6 +197,25 @@ class ParameterExplorer():
             param_to_vals[param] += [(value, weight)]
         return param_to_vals
     
+    def _evaluate_configs(self, configs):
+        """ Evaluates configurations, in parallel if a scheduler is set.
+        
+        Args:
+            configs: list of configurations to evaluate
+        
+        Returns:
+            List of rewards (improvements over default configuration).
+        """
+        if self.dbms and self.scheduler:
+            rewards = []
+            for config, metrics in zip(configs, self.scheduler.measure(configs)):
+                reward = calculate_reward(metrics, self.def_metrics, self.objective)
+                print(f'Reward {reward} with {config}')
+                rewards.append(reward)
+            return rewards
+        else:
+            return [self._evaluate_config(config) for config in configs]
+    
     def _evaluate_config(self, config):
         """ Evaluates given configuration and returns duration in milliseconds. 
         
@@ -148,15 +226,9 @@ class ParameterExplorer():
             Improvement over default configuration in milliseconds.
         """
         if self.dbms:
-            self.dbms.reset_config()
-            print(f'Trying configuration: {config}')
-            for param, value in config.items():
-                self.dbms.set_param_smart(param, value)
-            if self.dbms.reconfigure():
-                metrics = self.benchmark.evaluate()
-                reward = calculate_reward(metrics, self.def_metrics, self.objective)
-            else: 
-                reward = -10000
+            metrics = measure_config(
+                self.dbms, self.benchmark, config, self.eval_cache)
+            reward = calculate_reward(metrics, self.def_metrics, self.objective)
             print(f'Reward {reward} with {config}')
             return reward
         else:
@@ -0,0 +1,53 @@
+'''
+Tests for the cache of benchmark results.
+'''
+from search.eval_cache import EvaluationCache, ReusePolicy
+import os
+import tempfile
+import unittest
+
+class TestEvaluationCache(unittest.TestCase):
+    """ Test reuse and persistence of benchmark results. """
+    
+    def test_canonical_keys(self):
+        """ Equivalent configurations share cached metrics. """
+        cache = EvaluationCache()
+        cache.record({'shared_buffers':'1GB', 'jit':'On'}, {'error':False, 'time':10})
+        metrics = cache.lookup({'JIT':'on', 'shared_buffers':'1000MB'})
+        self.assertEqual(metrics, {'error':False, 'time':10})
+        self.assertIsNone(cache.lookup({'shared_buffers':'2GB', 'jit':'on'}))
+        cache.record({'jit':'off'}, {'error':True})
+        self.assertIsNone(cache.lookup({'jit':'off'}))
+    
+    def test_policies(self):
+        """ Reuse decisions of noise and refresh policy. """
+        config = {'work_mem':'4MB'}
+        cache = EvaluationCache(policy=ReusePolicy.NOISE, noise_budget=0.1)
+        cache.record(config, {'error':False, 'time':100})
+        self.assertIsNone(cache.lookup(config))
+        cache.record(config, {'error':False, 'time':104})
+        self.assertEqual(cache.lookup(config), {'error':False, 'time':102})
+        cache.record(config, {'error':False, 'time':150})
+        self.assertIsNone(cache.lookup(config))
+        failed = {'work_mem':'8MB'}
+        cache.record(failed, {'error':True})
+        cache.record(failed, {'error':True})
+        self.assertIsNone(cache.lookup(failed))
+        
+        cache = EvaluationCache(policy=ReusePolicy.REFRESH, max_hits=2)
+        cache.record(config, {'error':False, 'time':100})
+        self.assertIsNotNone(cache.lookup(config))
+        self.assertIsNotNone(cache.lookup(config))
+        self.assertIsNone(cache.lookup(config))
+    
+    def test_persistence(self):
+        """ Results are reloaded only for the same context. """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'evals.json')
+            cache = EvaluationCache(path, {'db':'tpch'})
+            cache.record({'work_mem':'4MB'}, {'error':False, 'time':5})
+            cache = EvaluationCache(path, {'db':'tpch'})
+            self.assertEqual(
+                cache.lookup({'work_mem':'4MB'}), {'error':False, 'time':5})
+            cache = EvaluationCache(path, {'db':'job'})
+            self.assertIsNone(cache.lookup({'work_mem':'4MB'}))
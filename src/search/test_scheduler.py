@@ -0,0 +1,56 @@
+'''
+Tests for parallel evaluations on DBMS replicas.
+'''
+from search.eval_cache import EvaluationCache
+from search.scheduler import EvaluationScheduler
+import time
+import unittest
+
+class Replica():
+    """ Simulates DBMS and benchmark, measuring configured value. """
+    
+    def __init__(self, slowdown=1):
+        self.slowdown = slowdown
+        self.config = {}
+        self.nr_evals = 0
+    
+    def reset_config(self):
+        self.config = {}
+    
+    def set_param_smart(self, param, value):
+        self.config[param] = value
+    
+    def reconfigure(self):
+        return True
+    
+    def evaluate(self):
+        time.sleep(0.1)
+        self.nr_evals += 1
+        work_mem = int(self.config.get('work_mem', 10))
+        return {'error': False, 'time': work_mem * self.slowdown}
+
+class TestEvaluationScheduler(unittest.TestCase):
+    """ Test dispatching configurations to replicas. """
+    
+    def test_measure(self):
+        """ Configurations are evaluated in parallel, once each. """
+        replicas = [Replica() for _ in range(4)]
+        cache = EvaluationCache()
+        cache.record({'work_mem':'7'}, {'error':False, 'time':7})
+        scheduler = EvaluationScheduler([(r, r) for r in replicas], cache)
+        configs = [{'work_mem':str(v)} for v in [1, 2, 3, 2, 7, 4]]
+        start_s = time.time()
+        metrics = scheduler.measure(configs)
+        elapsed_s = time.time() - start_s
+        self.assertEqual([m['time'] for m in metrics], [1, 2, 3, 2, 7, 4])
+        self.assertEqual(sum(r.nr_evals for r in replicas), 4)
+        self.assertLess(elapsed_s, 0.3)
+        self.assertEqual(cache.lookup({'work_mem':'3'})['time'], 3)
+    
+    def test_calibrate(self):
+        """ Metrics of slower replicas are scaled to reference metrics. """
+        replicas = [Replica(1), Replica(3)]
+        scheduler = EvaluationScheduler([(r, r) for r in replicas])
+        scheduler.calibrate({'error':False, 'time':20}, nr_runs=1)
+        metrics = scheduler.measure([{'work_mem':'4'}, {'work_mem':'5'}])
+        self.assertEqual([m['time'] for m in metrics], [8, 10])
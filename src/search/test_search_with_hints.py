@@ -4,14 +4,33 @@ Created on Apr 20, 2021
 @author: immanueltrummer
 '''
 from search.search_with_hints import ParameterExplorer
+import random
 import unittest
 
+def reference_config(explorer, configs, param_to_w_vals):
+    """ Selects next configuration via scalar distance calculations. """
+    config = {}
+    for p, w_vals in param_to_w_vals.items():
+        ref_vals = [c[p] for c in configs]
+        min_dist = float('inf')
+        best_val = w_vals[0][0]
+        for val, _ in w_vals:
+            exp_refs = ref_vals + [val]
+            exp_dist = max([w * min([
+                explorer._distance(v, r) for r in exp_refs])
+                for v, w in w_vals])
+            if exp_dist < min_dist:
+                min_dist = exp_dist
+                best_val = val
+        config[p] = best_val
+    return config
+
 class TestParameterExplorer(unittest.TestCase):
     """ Test parameter explorer. """
     
     @classmethod
     def setUpClass(cls):
-        cls.explorer = ParameterExplorer(None, None)
+        cls.explorer = ParameterExplorer(None, None, None)
     
     def test_config_selection(self):
         """ Test selection of next configuration. """
@@ -19,4 +38,22 @@ class TestParameterExplorer(unittest.TestCase):
         hint_to_weight[('innodb_buffer_pool_size', 2)] = 10
         hint_to_weight[('innodb_buffer_pool_size', 4)] = 10
         print(self.explorer._gather_values(hint_to_weight))
-        print(self.explorer._select_configs(hint_to_weight, 2))
\ No newline at end of file
+        print(self.explorer._select_configs(hint_to_weight, 2))
+    
+    def test_vectorized_selection(self):
+        """ Compare selection with scalar reference implementation. """
+        random.seed(0)
+        values = ['on', 'off', 8, '8', '8.5', '4x']
+        for i in range(1, 40):
+            values += [str(i) + random.choice(['', 'kB', 'MB', 'GB', 'ms'])]
+        hint_to_weight = {}
+        for param in ['p1', 'p2', 'p3']:
+            for value in random.sample(values, 20):
+                hint_to_weight[(param, value)] = random.choice([1, 2, 4, 8])
+        param_to_w_vals = self.explorer._gather_values(hint_to_weight)
+        configs = []
+        for _ in range(10):
+            config = self.explorer._next_config(configs, param_to_w_vals)
+            self.assertEqual(config, reference_config(
+                self.explorer, configs, param_to_w_vals))
+            configs.append(config)